@@ -0,0 +1,7 @@
+__author__ = 'justinarmstrong'
+
+"""
+Headless benchmarks of the game.  Each scenario is a fixed run through
+Level1 that plays the same frames every time; run.py times them and
+compares the results against a saved baseline.
+"""
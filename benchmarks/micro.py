@@ -0,0 +1,366 @@
+__author__ = 'justinarmstrong'
+
+"""
+Times single pieces of the game on their own, so a change to one hot
+path can be measured without the noise of the rest of the frame:
+
+    python -m benchmarks.micro
+    python -m benchmarks.micro mario_images score --repeat 50
+
+Each benchmark runs in a process of its own.  It is warmed up, then
+timed for --repeat repetitions of number calls each, with its setup() run
+untimed before every repetition.
+The cold benchmarks empty the frame cache in setup(), so they time what a
+first start pays; the others time the cached path every later call takes.
+"""
+
+import os
+import sys
+import json
+import argparse
+import pygame as pg
+from data import setup, tools
+from data import constants as c
+from data.components import mario, score, info
+from data.environment import NEW_GAME_INFO
+from data.profiler import timer, get_percentile
+from data.rollout import get_context
+from data.states import level1
+from .run import get_median, get_mad
+
+
+GRAPHICS_DIRECTORY = os.path.join('resources', 'graphics')
+
+
+def clear_caches():
+    """Forgets every scaled frame and the HUD's glyph strip"""
+    tools.clear_frame_cache()
+    info.OverheadInfo.glyph_strip = None
+    info.OverheadInfo.glyph_areas = None
+
+
+def get_game_info():
+    game_info = dict(NEW_GAME_INFO)
+    game_info[c.LEVEL_STATE] = c.NOT_FROZEN
+    return game_info
+
+
+class Benchmark(object):
+    """Something to time.  run() is called number times per repetition,
+    and the time reported is per call."""
+    name = None
+    description = None
+    number = 1
+
+    def setup(self):
+        """Called untimed before every repetition"""
+        pass
+
+
+    def teardown(self):
+        """Called untimed after every repetition"""
+        pass
+
+
+    def run(self):
+        raise NotImplementedError
+
+
+class MarioImages(Benchmark):
+    name = 'mario_images'
+    description = 'Mario.load_images_from_sheet with the frame cache empty'
+
+    def __init__(self):
+        self.mario = mario.Mario()
+
+    def setup(self):
+        clear_caches()
+
+    def run(self):
+        self.mario.load_images_from_sheet()
+
+
+class MarioImagesCached(MarioImages):
+    name = 'mario_images_cached'
+    description = 'Mario.load_images_from_sheet with every frame cached'
+    number = 20
+
+    def setup(self):
+        pass
+
+
+class ScoreInit(Benchmark):
+    name = 'score'
+    description = 'Score.__init__ with the frame cache empty'
+
+    def setup(self):
+        clear_caches()
+
+    def run(self):
+        score.Score(100, 100, 1000)
+
+
+class ScoreInitCached(ScoreInit):
+    name = 'score_cached'
+    description = 'Score.__init__ with every frame cached'
+    number = 200
+
+    def setup(self):
+        pass
+
+
+class OverheadInfoInit(Benchmark):
+    name = 'overhead_init'
+    description = 'OverheadInfo.__init__ with the frame cache empty'
+
+    def __init__(self):
+        self.game_info = get_game_info()
+
+    def setup(self):
+        clear_caches()
+
+    def run(self):
+        info.OverheadInfo(self.game_info, c.LEVEL)
+
+
+class OverheadInfoInitCached(OverheadInfoInit):
+    name = 'overhead_init_cached'
+    description = 'OverheadInfo.__init__ with every frame cached'
+    number = 20
+
+    def setup(self):
+        pass
+
+
+class OverheadInfoUpdate(Benchmark):
+    name = 'overhead_update'
+    description = ('OverheadInfo.update during play, with the score and '
+                   'clock changing as often as they can')
+    number = 1000
+
+    def __init__(self):
+        self.game_info = get_game_info()
+        self.overhead_info = info.OverheadInfo(self.game_info, c.LEVEL)
+        self.mario = mario.Mario()
+
+    def run(self):
+        self.game_info[c.SCORE] += 50
+        self.game_info[c.CURRENT_TIME] += 500
+        if self.overhead_info.time < 100:
+            self.overhead_info.time = 401
+        self.overhead_info.update(self.game_info, self.mario)
+
+
+class MarioXCollisions(Benchmark):
+    """Mario is put at points along the whole level in turn"""
+    name = 'mario_x_collisions'
+    description = ('the collision queries of Level1.check_mario_x_collisions, '
+                   'with Mario at points along the level')
+    number = 1000
+
+    def __init__(self):
+        self.level = level1.Level1(c.RENDER_NONE)
+        self.level.startup(0, get_game_info())
+        for group in self.level.enemy_group_list:
+            self.level.enemy_group.add(group)
+        bottom = self.level.mario.rect.bottom
+        self.positions = [(x, bottom) for x
+                          in range(0, self.level.level_rect.width, 37)]
+        self.index = 0
+
+    def run(self):
+        level = self.level
+        sprite = level.mario
+        sprite.rect.x, sprite.rect.bottom = \
+            self.positions[self.index % len(self.positions)]
+        self.index += 1
+        level.ground_step_pipe_group.collideany(sprite)
+        level.coin_box_group.collideany(sprite)
+        level.brick_group.collideany(sprite)
+        pg.sprite.spritecollideany(sprite, level.enemy_group)
+        pg.sprite.spritecollideany(sprite, level.shell_group)
+        pg.sprite.spritecollideany(sprite, level.powerup_group)
+
+
+class EnemyYCollisions(Benchmark):
+    """Every enemy in the level is checked in turn"""
+    name = 'enemy_y_collisions'
+    description = ('the collision queries of Level1.check_enemy_y_collisions, '
+                   'for each enemy in the level')
+    number = 1000
+
+    def __init__(self):
+        self.level = level1.Level1(c.RENDER_NONE)
+        self.level.startup(0, get_game_info())
+        self.enemies = [enemy for group in self.level.enemy_group_list
+                        for enemy in group]
+        self.index = 0
+
+    def run(self):
+        level = self.level
+        enemy = self.enemies[self.index % len(self.enemies)]
+        self.index += 1
+        level.ground_step_pipe_group.collideany(enemy)
+        level.brick_group.collideany(enemy)
+        level.coin_box_group.collideany(enemy)
+
+
+class LoadAllGfx(Benchmark):
+    name = 'load_all_gfx'
+    description = 'tools.load_all_gfx of every sprite sheet'
+
+    def setup(self):
+        self.sheets = dict(tools.SHEETS)
+        self.sheet_names = dict(tools.SHEET_NAMES)
+
+    def teardown(self):
+        tools.SHEETS.clear()
+        tools.SHEETS.update(self.sheets)
+        tools.SHEET_NAMES.clear()
+        tools.SHEET_NAMES.update(self.sheet_names)
+
+    def run(self):
+        tools.load_all_gfx(GRAPHICS_DIRECTORY)
+
+
+class LevelStartup(Benchmark):
+    name = 'level_startup'
+    description = ('Level1.startup the first time, building the level with '
+                   'the frame cache empty')
+
+    def setup(self):
+        clear_caches()
+        self.level = level1.Level1(c.RENDER_FULL)
+
+    def run(self):
+        self.level.startup(0, get_game_info())
+
+
+class LevelRestart(Benchmark):
+    name = 'level_restart'
+    description = 'Level1.startup again, resetting the level from its template'
+    number = 10
+
+    def __init__(self):
+        self.level = level1.Level1(c.RENDER_FULL)
+        self.level.startup(0, get_game_info())
+
+    def run(self):
+        self.level.startup(0, get_game_info())
+
+
+BENCHMARKS = [MarioImages, MarioImagesCached, ScoreInit, ScoreInitCached,
+              OverheadInfoInit, OverheadInfoInitCached, OverheadInfoUpdate,
+              MarioXCollisions, EnemyYCollisions, LoadAllGfx, LevelStartup,
+              LevelRestart]
+BENCHMARK_NAMES = [benchmark.name for benchmark in BENCHMARKS]
+
+
+def time_benchmark(benchmark, repeat, warmup):
+    """Microseconds per call for each of repeat repetitions, after warmup
+    untimed ones"""
+    times = []
+    for i in range(warmup + repeat):
+        benchmark.setup()
+        start = timer()
+        for _ in range(benchmark.number):
+            benchmark.run()
+        elapsed = timer() - start
+        benchmark.teardown()
+        if i >= warmup:
+            times.append(elapsed / benchmark.number * 1e6)
+    return times
+
+
+def run_time_benchmark(connection, name, repeat, warmup):
+    """Process target: sends back time_benchmark()'s times"""
+    setup.init(True)
+    benchmark = BENCHMARKS[BENCHMARK_NAMES.index(name)]()
+    connection.send(time_benchmark(benchmark, repeat, warmup))
+    connection.close()
+
+
+def time_in_process(name, repeat, warmup):
+    """Runs time_benchmark() in a fresh child process, so that no
+    benchmark starts with what another left in the caches"""
+    context = get_context()
+    connection, child_connection = context.Pipe()
+    process = context.Process(target=run_time_benchmark,
+                              args=(child_connection, name, repeat, warmup))
+    process.start()
+    child_connection.close()
+    try:
+        times = connection.recv()
+    except EOFError:
+        raise RuntimeError('the {} benchmark crashed'.format(name))
+    finally:
+        process.join()
+    return times
+
+
+def get_summary(times):
+    """Statistics of a benchmark's per call times"""
+    ordered = sorted(times)
+    mean = sum(ordered) / len(ordered)
+    variance = sum((time - mean) ** 2 for time in ordered) / \
+        max(len(ordered) - 1, 1)
+    return {'repeat': len(ordered),
+            'min': ordered[0],
+            'median': get_median(ordered),
+            'mean': mean,
+            'stdev': variance ** 0.5,
+            'mad': get_mad(ordered),
+            'p95': get_percentile(ordered, 95),
+            'max': ordered[-1]}
+
+
+def format_summaries(summaries):
+    columns = ['min', 'median', 'mean', 'stdev', 'mad', 'p95', 'max']
+    lines = ['{:<22}{:>8}'.format('benchmark (us)', 'calls') +
+             ''.join('{:>11}'.format(name) for name in columns)]
+    for name, number, summary in summaries:
+        lines.append('{:<22}{:>8}'.format(name, number) +
+                     ''.join('{:>11.1f}'.format(summary[column])
+                             for column in columns))
+    return '\n'.join(lines)
+
+
+def parse_args():
+    """Command line options"""
+    parser = argparse.ArgumentParser(description='Microbenchmarks of parts '
+                                                 'of Super Mario Bros 1-1')
+    parser.add_argument('benchmarks', nargs='*', metavar='BENCHMARK',
+                        help='benchmarks to run, out of {} (default: '
+                             'all)'.format(', '.join(BENCHMARK_NAMES)))
+    parser.add_argument('--repeat', type=int, default=30,
+                        help='timed repetitions of each benchmark')
+    parser.add_argument('--warmup', type=int, default=3,
+                        help='untimed repetitions before those')
+    parser.add_argument('--save', metavar='FILE',
+                        help='save the statistics to a JSON file')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    names = args.benchmarks or BENCHMARK_NAMES
+    for name in names:
+        if name not in BENCHMARK_NAMES:
+            sys.exit('no benchmark called {}; choose from {}'.format(
+                name, ', '.join(BENCHMARK_NAMES)))
+
+    summaries = []
+    for benchmark in BENCHMARKS:
+        if benchmark.name in names:
+            times = time_in_process(benchmark.name, args.repeat, args.warmup)
+            summaries.append((benchmark.name, benchmark.number,
+                              get_summary(times)))
+    print(format_summaries(summaries))
+    if args.save:
+        with open(args.save, 'w') as results_file:
+            json.dump(dict((name, summary) for name, _, summary in summaries),
+                      results_file, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+__author__ = 'justinarmstrong'
+
+"""
+Times the scenarios headless and compares them with a saved baseline:
+
+    python -m benchmarks.run --save baseline.json
+    python -m benchmarks.run --compare baseline.json
+
+Every repeat of every scenario runs in a fresh process, so one cannot
+warm the caches of the next and peak RSS is the scenario's own.  Frame
+times are taken on one pass; allocations on a second, with tracemalloc
+on, so that its overhead stays out of the times.  The exit status is 1
+if the comparison finds a regression.
+"""
+
+import gc
+import sys
+import json
+import platform
+import argparse
+import tracemalloc
+from array import array
+try:
+    import resource
+except ImportError:
+    resource = None
+import pygame as pg
+from data import constants as c
+from data.environment import Level1Env
+from data.profiler import timer, get_percentile
+from data.rollout import get_context
+from .scenarios import SCENARIO_NAMES, get_scenario
+
+
+#name: (label, whether a bigger value is better)
+METRICS = [('fps', ('frames/s', True)),
+           ('p50', ('p50 ms', False)),
+           ('p95', ('p95 ms', False)),
+           ('p99', ('p99 ms', False)),
+           ('alloc_kb', ('alloc KB/frame', False)),
+           ('blocks', ('blocks/frame', False)),
+           ('rss_mb', ('peak RSS MB', False))]
+
+#blocks/frame is about zero when nothing leaks, so a relative change in it
+#means nothing; it is reported but never counted as a regression
+COMPARED = ('fps', 'p50', 'p95', 'p99', 'alloc_kb', 'rss_mb')
+
+#Scales a median absolute deviation to a standard deviation
+MAD_SCALE = 1.4826
+
+
+def play(scenario, env, frames, before_frame, after_frame):
+    """Plays frames frames of a scenario, starting the level over
+    whenever it ends.  The callbacks are given the frame's index just
+    before and after it is played; resets happen outside them."""
+    env.reset()
+    scenario.start(env)
+    for i in range(frames):
+        action = scenario.get_action(env)
+        before_frame(i)
+        env.advance(action)
+        after_frame(i)
+        if env.done:
+            env.reset()
+            scenario.start(env)
+
+
+def measure(name, frames, render_mode):
+    """Times one scenario in this process and returns its metrics"""
+    scenario = get_scenario(name)
+    env = Level1Env(1, render_mode)
+    times = array('d', [0.0]) * frames
+
+    def start_timing(i):
+        times[i] = timer()
+
+    def stop_timing(i):
+        times[i] = timer() - times[i]
+
+    play(scenario, env, frames, start_timing, stop_timing)
+    ordered = sorted(times)
+
+    allocated = array('d', [0.0]) * frames
+    tracemalloc.start()
+    gc.collect()
+    first_blocks = sys.getallocatedblocks()
+
+    def start_tracing(i):
+        tracemalloc.reset_peak()
+        allocated[i] = tracemalloc.get_traced_memory()[0]
+
+    def stop_tracing(i):
+        allocated[i] = tracemalloc.get_traced_memory()[1] - allocated[i]
+
+    play(scenario, env, frames, start_tracing, stop_tracing)
+    gc.collect()
+    blocks = sys.getallocatedblocks() - first_blocks
+    tracemalloc.stop()
+
+    rss = None
+    if resource is not None:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        rss /= 1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0
+
+    return {'fps': frames / sum(times),
+            'p50': get_percentile(ordered, 50) * 1000.0,
+            'p95': get_percentile(ordered, 95) * 1000.0,
+            'p99': get_percentile(ordered, 99) * 1000.0,
+            'alloc_kb': sum(allocated) / frames / 1024.0,
+            'blocks': blocks / float(frames),
+            'rss_mb': rss}
+
+
+def run_measure(connection, name, frames, render_mode):
+    """Process target: sends back measure()'s metrics"""
+    connection.send(measure(name, frames, render_mode))
+    connection.close()
+
+
+def measure_in_process(name, frames, render_mode):
+    """Runs measure() in a fresh child process"""
+    context = get_context()
+    connection, child_connection = context.Pipe()
+    process = context.Process(target=run_measure,
+                              args=(child_connection, name, frames,
+                                    render_mode))
+    process.start()
+    child_connection.close()
+    try:
+        metrics = connection.recv()
+    except EOFError:
+        raise RuntimeError('the {} benchmark crashed'.format(name))
+    finally:
+        process.join()
+    return metrics
+
+
+def get_median(values):
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return (ordered[middle - 1] + ordered[middle]) / 2.0
+
+
+def get_mad(values):
+    """Median absolute deviation, as a standard deviation"""
+    median = get_median(values)
+    return get_median([abs(value - median) for value in values]) * MAD_SCALE
+
+
+def run_benchmarks(names, frames, repeat, render_mode, verbose=False):
+    """Measures each scenario repeat times.  Returns the results in the
+    form saved as a baseline."""
+    results = {'frames': frames,
+               'repeat': repeat,
+               'render': render_mode,
+               'python': platform.python_version(),
+               'pygame': pg.version.ver,
+               'machine': platform.machine(),
+               'scenarios': {}}
+    for name in names:
+        runs = []
+        for i in range(repeat):
+            runs.append(measure_in_process(name, frames, render_mode))
+            if verbose:
+                print('{} {}/{}: {:.0f} frames/s'.format(name, i + 1, repeat,
+                                                         runs[-1]['fps']))
+        median = dict((metric, get_median([run[metric] for run in runs])
+                                if runs[0][metric] is not None else None)
+                      for metric, _ in METRICS)
+        results['scenarios'][name] = {'runs': runs, 'median': median}
+    return results
+
+
+def compare(baseline, current, threshold):
+    """Checks each metric of each scenario the two results share.  A
+    metric regresses when its median got worse by more than threshold (a
+    fraction) and by more than three times the run to run noise of either
+    side.  Returns rows of (scenario, metric, baseline, current, change,
+    verdict)."""
+    rows = []
+    for name in sorted(current['scenarios']):
+        if name not in baseline['scenarios']:
+            continue
+        before = baseline['scenarios'][name]
+        after = current['scenarios'][name]
+        for metric, (label, higher_is_better) in METRICS:
+            old = before['median'].get(metric)
+            new = after['median'].get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else 0.0
+            noise = 3 * max(get_mad([run[metric] for run in before['runs']]),
+                            get_mad([run[metric] for run in after['runs']]))
+            worse = new < old if higher_is_better else new > old
+            verdict = 'ok'
+            if metric in COMPARED and abs(change) > threshold and \
+                    abs(new - old) > noise:
+                verdict = 'REGRESSED' if worse else 'improved'
+            rows.append((name, label, old, new, change, verdict))
+    return rows
+
+
+def format_results(results):
+    """The medians of every scenario as a table"""
+    lines = ['{:<12}'.format('scenario') +
+             ''.join('{:>16}'.format(label) for _, (label, _) in METRICS)]
+    for name in sorted(results['scenarios']):
+        median = results['scenarios'][name]['median']
+        lines.append('{:<12}'.format(name) + ''.join(
+            '{:>16.3f}'.format(median[metric]) if median[metric] is not None
+            else '{:>16}'.format('-') for metric, _ in METRICS))
+    return '\n'.join(lines)
+
+
+def format_comparison(rows):
+    lines = ['{:<12}{:<16}{:>12}{:>12}{:>9}  {}'.format(
+        'scenario', 'metric', 'baseline', 'current', 'change', '')]
+    for name, label, old, new, change, verdict in rows:
+        lines.append('{:<12}{:<16}{:>12.3f}{:>12.3f}{:>8.1f}%  {}'.format(
+            name, label, old, new, change * 100, verdict))
+    return '\n'.join(lines)
+
+
+def parse_args():
+    """Command line options"""
+    parser = argparse.ArgumentParser(description='Headless benchmarks of '
+                                                 'Super Mario Bros 1-1')
+    parser.add_argument('scenarios', nargs='*', metavar='SCENARIO',
+                        help='scenarios to run, out of {} (default: '
+                             'all)'.format(', '.join(SCENARIO_NAMES)))
+    parser.add_argument('--frames', type=int, default=2000,
+                        help='frames to play per run')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='runs of each scenario, each in a new process')
+    parser.add_argument('--render', choices=[c.RENDER_FULL, c.RENDER_DIRTY,
+                                             c.RENDER_NONE],
+                        default=c.RENDER_FULL,
+                        help='how the level is drawn to its offscreen surface')
+    parser.add_argument('--save', metavar='FILE',
+                        help='save the results as a JSON baseline')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='compare the results with a saved baseline')
+    parser.add_argument('--threshold', type=float, default=0.05,
+                        help='how much worse, as a fraction, a metric has to '
+                             'get to count as a regression')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    names = args.scenarios or SCENARIO_NAMES
+    for name in names:
+        if name not in SCENARIO_NAMES:
+            sys.exit('no scenario called {}; choose from {}'.format(
+                name, ', '.join(SCENARIO_NAMES)))
+
+    results = run_benchmarks(names, args.frames, args.repeat, args.render,
+                             True)
+    print(format_results(results))
+    if args.save:
+        with open(args.save, 'w') as results_file:
+            json.dump(results, results_file, indent=2, sort_keys=True)
+
+    status = 0
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        if (baseline['frames'], baseline['render']) != \
+                (args.frames, args.render):
+            print('Warning: the baseline played {} frames rendering {}'.format(
+                baseline['frames'], baseline['render']))
+        rows = compare(baseline, results, args.threshold)
+        print(format_comparison(rows))
+        if any(row[-1] == 'REGRESSED' for row in rows):
+            status = 1
+    sys.exit(status)
+
+
+if __name__ == '__main__':
+    main()
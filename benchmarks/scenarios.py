@@ -0,0 +1,130 @@
+__author__ = 'justinarmstrong'
+
+"""
+The runs the benchmarks time.  Every scenario picks each frame's action
+itself from a fixed script, and the game runs on a FixedStepClock, so a
+scenario plays out identically on every machine and every run.
+
+The routes are strings of steps: a letter for what is held down and how
+many frames it is held for.  R runs right, J runs right holding jump and
+B walks left, which is how a route backs up for a run up.  They were
+found by searching the level from snapshots and only need redoing if a
+change to the game's physics makes one of them miss the flagpole.
+"""
+
+from data.environment import ACTIONS
+
+
+ROUTE_ACTIONS = {'R': ACTIONS.index(('right', 'action')),
+                 'J': ACTIONS.index(('right', 'jump', 'action')),
+                 'B': ACTIONS.index(('left',))}
+
+#With the action button let go, for firing fireballs
+RELEASED_ACTIONS = {ACTIONS.index(('right', 'action')):
+                        ACTIONS.index(('right',)),
+                    ACTIONS.index(('right', 'jump', 'action')):
+                        ACTIONS.index(('right', 'jump'))}
+
+NOTHING = ACTIONS.index(())
+
+SPEED_RUN = ('R33 J20 R34 J26 R2 J26 R49 J20 R21 J24 R26 J28 R45 J17 R27 '
+             'J26 R29 J26 R52 J26 R38 J23 R28 J26 R2 J26 R32 B34 R8 J20 R28 '
+             'B20 R11 J30 R3 J26 R14 B37 R3 J26 R33 J26 R15 J26 R33 J6 R46 '
+             'J14 R35 J26 R17 J26 R13 J26 R51 J20')
+
+STAR_RUN = ('R14 J30 R35 J6 R48 J29 R2 J26 R51 J26 R18 J24 R46 J26 R31 J30 '
+            'R56 J16 R28 B33 J22 R32 J8 R28 J25 R11 J7 R29 J7 R45 J12 R14 J9 '
+            'R33 J16 R14 J26 R54 J26 R15 J26 R36 J26 R20 J30 R32 J26 R21 J26 '
+            'R8 J26 R69 J1')
+
+FIRE_RUN = ('R32 B6 R4 J18 R76 J31 R33 B27 R1 J9 R86 J26 R66 J26 R23 B23 R56 '
+            'J26 R8 J21 R42 J26 R29 J26 R41 J26 R37 B8 R12 J11 R13 J5 R26 J26 '
+            'R28 J27 R66 J21 R29 B7 R52 J20 R33 J14 R12 J17 R29 B23 R14 J30 '
+            'R35 J6 R31 J29 R34 B28 R6 B19 R23 B37 R12 J22 R32 B17 J10 R34 '
+            'B26 R40 J23 R15 J26 R30 J20 R26 J26 R41 J14 R19 J26 R13 J5 R78 '
+            'J18')
+
+
+def parse_route(route):
+    """A route string as a list of ACTIONS indexes, one per frame"""
+    actions = []
+    for step in route.split():
+        actions.extend([ROUTE_ACTIONS[step[0]]] * int(step[1:]))
+    return actions
+
+
+class Scenario(object):
+    """Stands Mario still.  Subclasses follow a route instead, and may
+    change Mario when the level starts or before every frame.  Once the
+    route runs out nothing is held down, which lets the level finish."""
+    name = 'idle'
+    description = 'Mario stands still at the start of the level'
+    route = ''
+
+    def __init__(self):
+        self.actions = parse_route(self.route)
+
+
+    def start(self, env):
+        """Called after every reset of env"""
+        pass
+
+
+    def get_action(self, env):
+        """The action to take on env's next frame"""
+        if env.frame < len(self.actions):
+            return self.actions[env.frame]
+        return NOTHING
+
+
+class SpeedRun(Scenario):
+    name = 'speedrun'
+    description = 'small Mario runs and jumps from the start to the flagpole'
+    route = SPEED_RUN
+
+
+class StarRun(Scenario):
+    name = 'star'
+    description = 'Mario keeps a star all the way and runs through enemies'
+    route = STAR_RUN
+
+    def start(self, env):
+        env.level.mario.invincible = True
+
+
+    def get_action(self, env):
+        mario = env.level.mario
+        if mario.invincible:
+            mario.invincible_start_timer = env.level.current_time
+        return Scenario.get_action(self, env)
+
+
+class FireballSpam(Scenario):
+    name = 'fireballs'
+    description = ('fire Mario runs to the flagpole pressing the action '
+                   'button every eighth frame, keeping two fireballs out')
+    route = FIRE_RUN
+
+    def start(self, env):
+        env.level.mario.become_big()
+        env.level.mario.fire = True
+
+
+    def get_action(self, env):
+        action = Scenario.get_action(self, env)
+        if (env.frame // 4) % 2:
+            return RELEASED_ACTIONS.get(action, action)
+        return action
+
+
+SCENARIOS = [Scenario, SpeedRun, StarRun, FireballSpam]
+SCENARIO_NAMES = [scenario.name for scenario in SCENARIOS]
+
+
+def get_scenario(name):
+    """A new scenario by name"""
+    for scenario in SCENARIOS:
+        if scenario.name == name:
+            return scenario()
+    raise ValueError('no scenario called {}; choose from {}'.format(
+        name, ', '.join(SCENARIO_NAMES)))
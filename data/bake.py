@@ -0,0 +1,221 @@
+__author__ = 'justinarmstrong'
+
+"""
+Bakes the graphics ahead of time so that startup does no image
+processing:
+
+    python -m data.bake
+
+The bake holds every sprite sheet already converted to the display's
+format, and a packed atlas of every frame the game cuts out of them,
+already scaled.  Both are stored as raw pixels in one file, next to an
+index of where everything sits in it.  setup.init() then reads that file
+once, instead of decoding each PNG and cutting and scaling hundreds of
+frames one by one.
+
+The index records a hash of the sprite sheets and the size multipliers.
+A bake that does not match the current ones is ignored and the graphics
+are loaded the slow way, as they are with no bake at all.
+"""
+
+import os
+import sys
+import json
+import hashlib
+import pygame as pg
+from . import tools
+from . import constants as c
+
+
+VERSION = 1
+BAKED_DIRECTORY = os.path.join('resources', 'baked')
+INDEX_NAME = 'index.json'
+ATLAS_WIDTH = 1024
+PADDING = 1
+
+
+def get_source_hash(directory):
+    """SHA-1 of every sprite sheet in directory and of the multipliers
+    frames are scaled by"""
+    digest = hashlib.sha1()
+    digest.update(repr((VERSION, c.SIZE_MULTIPLIER, c.BRICK_SIZE_MULTIPLIER,
+                        c.BACKGROUND_MULTIPLER)).encode('utf-8'))
+    for name in sorted(os.listdir(directory)):
+        if os.path.splitext(name)[1].lower() in tools.GFX_EXTENSIONS:
+            digest.update(name.encode('utf-8'))
+            with open(os.path.join(directory, name), 'rb') as sheet_file:
+                digest.update(sheet_file.read())
+    return digest.hexdigest()
+
+
+def to_tuple(value):
+    """A frame cache key read back from JSON, with its lists made tuples
+    again"""
+    if isinstance(value, list):
+        return tuple(to_tuple(item) for item in value)
+    return value
+
+
+def is_bakeable(key):
+    """Whether a frame cache key names its sheet, rather than holding a
+    surface, and so can be written to the index"""
+    if isinstance(key, tuple):
+        return all(is_bakeable(item) for item in key)
+    return not isinstance(key, pg.Surface)
+
+
+def make_frames():
+    """Builds every state, and every sprite the level only makes during
+    play, so that each frame the game uses ends up in the frame cache"""
+    from .main import create_states
+    from .environment import NEW_GAME_INFO
+    from .components import bricks, coin, powerups, score
+
+    tools.clear_frame_cache()
+    for state in create_states().values():
+        state.startup(0.0, dict(NEW_GAME_INFO))
+    powerups.Mushroom(0, 0)
+    powerups.LifeMushroom(0, 0)
+    powerups.FireFlower(0, 0)
+    powerups.Star(0, 0)
+    powerups.FireBall(0, 0, True)
+    powerups.FireBall(0, 0, False)
+    coin.Coin(0, 0, pg.sprite.Group())
+    bricks.BrickPiece(0, 0, 0, 0)
+    score.Score(0, 0, 100)
+
+
+def pack(sizes, width=ATLAS_WIDTH):
+    """Places rects of the given sizes in rows, tallest first.  Returns
+    their positions, in the same order, and the height used."""
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], i))
+    positions = [None] * len(sizes)
+    x = y = row_height = 0
+    for i in order:
+        frame_width, frame_height = sizes[i]
+        if x + frame_width > width:
+            x = 0
+            y += row_height + PADDING
+            row_height = 0
+        positions[i] = (x, y)
+        x += frame_width + PADDING
+        row_height = max(row_height, frame_height)
+    return positions, y + row_height
+
+
+def make_atlas(frames):
+    """Draws (key, image) frames into one surface.  Returns it and each
+    frame's entry in the index."""
+    positions, height = pack([image.get_size() for key, image in frames])
+    atlas = pg.Surface((ATLAS_WIDTH, max(height, 1))).convert()
+    entries = []
+    for (key, image), position in zip(frames, positions):
+        colorkey = image.get_colorkey()
+        alpha = image.get_alpha()
+        image.set_colorkey(None)
+        image.set_alpha(None)
+        atlas.blit(image, position)
+        image.set_colorkey(colorkey)
+        image.set_alpha(alpha)
+        entries.append({'key': key,
+                        'rect': list(position) + list(image.get_size()),
+                        'colorkey': colorkey,
+                        'alpha': alpha})
+    return atlas, entries
+
+
+def bake(graphics, graphics_directory, directory=BAKED_DIRECTORY):
+    """Writes a bake of the sheets in graphics, as loaded from
+    graphics_directory, and of the frames make_frames() cuts from them.
+    Returns how many frames were baked."""
+    make_frames()
+    atlas, entries = make_atlas([(key, image) for key, image
+                                 in tools.FRAME_CACHE.items()
+                                 if is_bakeable(key)])
+
+    source_hash = get_source_hash(graphics_directory)
+    data_name = 'graphics-{}.bin'.format(source_hash[:16])
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    sheets = []
+    offset = 0
+    with open(os.path.join(directory, data_name), 'wb') as data_file:
+        for name in sorted(graphics):
+            sheet = graphics[name]
+            pixels = pg.image.tostring(sheet, 'RGBA')
+            data_file.write(pixels)
+            sheets.append({'name': name,
+                           'size': list(sheet.get_size()),
+                           'alpha': bool(sheet.get_flags() & pg.SRCALPHA),
+                           'colorkey': sheet.get_colorkey(),
+                           'offset': offset})
+            offset += len(pixels)
+        data_file.write(pg.image.tostring(atlas, 'RGBA'))
+
+    with open(os.path.join(directory, INDEX_NAME), 'w') as index_file:
+        json.dump({'version': VERSION,
+                   'hash': source_hash,
+                   'data': data_name,
+                   'sheets': sheets,
+                   'atlas': {'size': list(atlas.get_size()),
+                             'offset': offset},
+                   'frames': entries}, index_file)
+    return len(entries)
+
+
+def get_surface(data, size, offset):
+    """A surface over the RGBA pixels at offset in data"""
+    width, height = size
+    end = offset + width*height*4
+    return pg.image.frombuffer(data[offset:end], (width, height), 'RGBA')
+
+
+def load(graphics_directory, directory=BAKED_DIRECTORY):
+    """Loads the sprite sheets from a bake of graphics_directory and fills
+    the frame cache from its atlas.  Returns the sheets keyed by name, as
+    tools.load_all_gfx does, or None if there is no bake or it is out of
+    date."""
+    try:
+        with open(os.path.join(directory, INDEX_NAME)) as index_file:
+            index = json.load(index_file)
+        if index.get('version') != VERSION or \
+                index.get('hash') != get_source_hash(graphics_directory):
+            return None
+        with open(os.path.join(directory, index['data']), 'rb') as data_file:
+            data = memoryview(data_file.read())
+    except (IOError, OSError, ValueError, KeyError):
+        return None
+
+    graphics = {}
+    for sheet in index['sheets']:
+        image = get_surface(data, sheet['size'], sheet['offset'])
+        if sheet['alpha']:
+            image = image.convert_alpha()
+        else:
+            image = image.convert()
+            image.set_colorkey(sheet['colorkey'])
+        graphics[sheet['name']] = image
+        tools.add_sheet(sheet['name'], image)
+
+    atlas = get_surface(data, index['atlas']['size'],
+                        index['atlas']['offset']).convert()
+    for frame in index['frames']:
+        image = atlas.subsurface(frame['rect']).copy()
+        if frame['colorkey'] is not None:
+            image.set_colorkey(frame['colorkey'])
+        if frame['alpha'] is not None:
+            image.set_alpha(frame['alpha'])
+        key = to_tuple(frame['key'])
+        tools.FRAME_CACHE[key] = image
+        tools.FRAME_KEYS[image] = key
+    return graphics
+
+
+if __name__ == '__main__':
+    from . import setup
+    setup.init(True)
+    count = bake(setup.GFX, setup.GRAPHICS_DIRECTORY)
+    print('Baked {} sheets and {} frames into {}'.format(
+        len(setup.GFX), count, BAKED_DIRECTORY))
+    pg.quit()
+    sys.exit(0)
@@ -0,0 +1,75 @@
+__author__ = 'justinarmstrong'
+
+import pygame as pg
+
+
+class ChunkedBackground(object):
+    """A scaled level background that is never scaled as a whole.  The
+    unscaled sheet is cut into fixed-width chunks of the scaled image, which
+    are built when the camera first needs them and dropped again once more
+    than max_chunks are held.  Memory depends on the screen width, not the
+    level length.  Chunks are cut with the same nearest neighbour mapping
+    pg.transform.scale uses, so they match a full scale pixel for pixel."""
+    def __init__(self, sheet, multiplier, chunk_width=400, max_chunks=4):
+        self.sheet = sheet
+        width, height = sheet.get_size()
+        self.rect = pg.Rect(0, 0, int(width*multiplier), int(height*multiplier))
+        self.chunk_width = chunk_width
+        self.max_chunks = max_chunks
+        self.chunks = {}
+        self.chunk_order = []
+
+
+    def get_source_x(self, x):
+        """Sheet column that scaled column x is taken from"""
+        return x * self.sheet.get_width() // self.rect.width
+
+
+    def make_chunk(self, index):
+        """Scales one chunk of the background out of the sheet"""
+        left = index * self.chunk_width
+        right = min(left + self.chunk_width, self.rect.width)
+        source_left = self.get_source_x(left)
+        source_right = self.get_source_x(right - 1) + 1
+
+        strip = self.sheet.subsurface((source_left, 0,
+                                       source_right - source_left,
+                                       self.sheet.get_height()))
+        strip = pg.transform.scale(strip, (strip.get_width(), self.rect.height))
+        chunk = pg.Surface((right - left, self.rect.height), 0, self.sheet)
+        for x in range(left, right):
+            column = self.get_source_x(x) - source_left
+            chunk.blit(strip, (x - left, 0), (column, 0, 1, self.rect.height))
+        return chunk
+
+
+    def get_chunk(self, index):
+        """Returns a chunk, building it and evicting the least recently
+        used one if needed"""
+        chunk = self.chunks.get(index)
+        if chunk is None:
+            chunk = self.chunks[index] = self.make_chunk(index)
+            if len(self.chunk_order) >= self.max_chunks:
+                del self.chunks[self.chunk_order.pop(0)]
+        else:
+            self.chunk_order.remove(index)
+        self.chunk_order.append(index)
+        return chunk
+
+
+    def draw(self, surface, dest, area):
+        """Works like surface.blit(scaled_background, dest, area)"""
+        requested = pg.Rect(area)
+        area = requested.clip(self.rect)
+        if not area:
+            return
+        dest_x, dest_y = dest[0], dest[1]
+        first = area.left // self.chunk_width
+        last = (area.right - 1) // self.chunk_width
+        for index in range(first, last + 1):
+            chunk_left = index * self.chunk_width
+            part = area.clip((chunk_left, 0, self.chunk_width, self.rect.height))
+            surface.blit(self.get_chunk(index),
+                         (dest_x + part.x - requested.x,
+                          dest_y + part.y - requested.y),
+                         part.move(-chunk_left, 0))
@@ -15,3 +15,70 @@ class Collider(pg.sprite.Sprite):
         self.rect.y = y
         self.state = None
 
+
+
+class ColliderGroup(pg.sprite.Group):
+    """Sprite group that also files every sprite into a uniform grid so
+    collideany only has to look at the cells a rect touches instead of
+    scanning the whole level.  Sprites are filed by their rect when they
+    are added, grown by padding on every side, so anything that bobs a
+    few pixels from where it was added (bumped bricks and coin boxes) is
+    still found.  version goes up whenever a sprite is added or removed,
+    so anything built from the group can tell when to build again."""
+    def __init__(self, *sprites, **kwargs):
+        self.cell_size = kwargs.get('cell_size', 128)
+        self.padding = kwargs.get('padding', 0)
+        self.cells = {}
+        self.sprite_cells = {}
+        self.sprite_order = {}
+        self.added_count = 0
+        self.version = 0
+        pg.sprite.Group.__init__(self, *sprites)
+
+
+    def add_internal(self, sprite, *args):
+        """Adds the sprite to the group and to every cell it covers"""
+        pg.sprite.Group.add_internal(self, sprite, *args)
+        rect = sprite.rect.inflate(self.padding * 2, self.padding * 2)
+        keys = self.get_cell_keys(rect)
+        for key in keys:
+            self.cells.setdefault(key, []).append(sprite)
+        self.sprite_cells[sprite] = keys
+        self.sprite_order[sprite] = self.added_count
+        self.added_count += 1
+        self.version += 1
+
+
+    def remove_internal(self, sprite):
+        """Removes the sprite from the group and from its cells"""
+        pg.sprite.Group.remove_internal(self, sprite)
+        for key in self.sprite_cells.pop(sprite):
+            self.cells[key].remove(sprite)
+        del self.sprite_order[sprite]
+        self.version += 1
+
+
+    def get_cell_keys(self, rect):
+        """Returns the keys of all the cells a rect overlaps"""
+        size = self.cell_size
+        return [(x, y)
+                for x in range(rect.left // size, (rect.right - 1) // size + 1)
+                for y in range(rect.top // size, (rect.bottom - 1) // size + 1)]
+
+
+    def collideany(self, sprite):
+        """Same result as pg.sprite.spritecollideany(sprite, self): of the
+        sprites whose rect overlaps sprite.rect, the one added first"""
+        rect = sprite.rect
+        size = self.cell_size
+        order = self.sprite_order
+        found = None
+
+        for x in range(rect.left // size, (rect.right - 1) // size + 1):
+            for y in range(rect.top // size, (rect.bottom - 1) // size + 1):
+                for other in self.cells.get((x, y), ()):
+                    if rect.colliderect(other.rect):
+                        if found is None or order[other] < order[found]:
+                            found = other
+
+        return found
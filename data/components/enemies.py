@@ -2,7 +2,7 @@ __author__ = 'justinarmstrong'
 
 
 import pygame as pg
-from .. import setup
+from .. import setup, tools
 from .. import constants as c
 
 
@@ -45,17 +45,8 @@ class Enemy(pg.sprite.Sprite):
 
     def get_image(self, x, y, width, height):
         """Get the image frames from the sprite sheet"""
-        image = pg.Surface([width, height]).convert()
-        rect = image.get_rect()
-
-        image.blit(self.sprite_sheet, (0, 0), (x, y, width, height))
-        image.set_colorkey(c.BLACK)
-
-
-        image = pg.transform.scale(image,
-                                   (int(rect.width*c.SIZE_MULTIPLIER),
-                                    int(rect.height*c.SIZE_MULTIPLIER)))
-        return image
+        return tools.get_image(self.sprite_sheet, x, y, width, height,
+                               c.BLACK, c.SIZE_MULTIPLIER)
 
 
     def handle_state(self):
@@ -147,7 +138,7 @@ class Goomba(Enemy):
             self.get_image(30, 4, 16, 16))
         self.frames.append(
             self.get_image(61, 0, 16, 16))
-        self.frames.append(pg.transform.flip(self.frames[1], False, True))
+        self.frames.append(tools.flip_image(self.frames[1], False, True))
 
 
     def jumped_on(self):
@@ -174,7 +165,7 @@ class Koopa(Enemy):
             self.get_image(180, 0, 16, 24))
         self.frames.append(
             self.get_image(360, 5, 16, 15))
-        self.frames.append(pg.transform.flip(self.frames[2], False, True))
+        self.frames.append(tools.flip_image(self.frames[2], False, True))
 
 
     def jumped_on(self):
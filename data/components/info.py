@@ -1,25 +1,34 @@
 __author__ = 'justinarmstrong'
 
 import pygame as pg
-from .. import setup
+from .. import setup, tools
 from .. import constants as c
 from . import flashing_coin
 
 
 class Character(pg.sprite.Sprite):
-    """Parent class for all characters used for the overhead level info"""
-    def __init__(self, image):
+    """Parent class for all characters used for the overhead level info.
+    area is where the character sits in OverheadInfo.glyph_strip."""
+    def __init__(self, image, char, area):
         super(Character, self).__init__()
         self.image = image
+        self.char = char
+        self.area = area
         self.rect = self.image.get_rect()
 
 
 class OverheadInfo(object):
     """Class for level information like score, coin total,
-        and time remaining"""
+        and time remaining.  Labels are only touched when the value they
+        show changes, and every character is blitted out of one shared
+        glyph strip."""
+    glyph_strip = None
+    glyph_areas = None
+
     def __init__(self, game_info, state):
         self.sprite_sheet = setup.GFX['text_images']
         self.coin_total = game_info[c.COIN_TOTAL]
+        self.score = None
         self.time = 401
         self.current_time = 0
         self.total_lives = game_info[c.LIVES]
@@ -27,6 +36,7 @@ class OverheadInfo(object):
         self.state = state
         self.special_state = None
         self.game_info = game_info
+        self.changed_rects = []
 
         self.create_image_dict()
         self.create_score_group()
@@ -41,6 +51,43 @@ class OverheadInfo(object):
         self.create_main_menu_labels()
 
 
+    def reset(self, game_info, state):
+        """Puts the info back the way __init__ leaves it, reusing the
+        labels that already exist"""
+        self.coin_total = game_info[c.COIN_TOTAL]
+        self.score = None
+        self.time = 401
+        self.current_time = 0
+        self.total_lives = game_info[c.LIVES]
+        self.top_score = game_info[c.TOP_SCORE]
+        self.state = state
+        self.special_state = None
+        self.game_info = game_info
+        self.create_flashing_coin()
+        self.refresh_labels()
+        self.changed_rects = []
+
+
+    def refresh_labels(self):
+        """Points every label that shows a value at the value it should
+        show now"""
+        for letter in self.score_images:
+            self.set_character(letter, '0')
+        if self.score is not None:
+            self.update_score_images(self.score_images, self.score)
+        for letter, digit in zip(self.count_down_images,
+                                 str(self.time).zfill(3)):
+            self.set_character(letter, digit)
+        self.set_coin_label()
+        self.life_total_label = []
+        self.create_label(self.life_total_label, str(self.total_lives),
+                          450, 285)
+        top_score = self.main_menu_labels[3]
+        for letter in top_score:
+            self.set_character(letter, '0')
+        self.update_score_images(top_score, self.top_score)
+
+
     def create_image_dict(self):
         """Creates the initial images for the score"""
         self.image_dict = {}
@@ -95,18 +142,39 @@ class OverheadInfo(object):
         for character, image in zip(character_string, image_list):
             self.image_dict[character] = image
 
+        if OverheadInfo.glyph_strip is None:
+            self.create_glyph_strip(character_string)
+
+
+    def create_glyph_strip(self, character_string):
+        """Packs every character image side by side into one surface that
+        all labels are blitted from"""
+        colorkey = (92, 148, 252)
+        width = sum(self.image_dict[char].get_width()
+                    for char in character_string)
+        height = max(self.image_dict[char].get_height()
+                     for char in character_string)
+
+        strip = pg.Surface((width, height)).convert()
+        strip.fill(colorkey)
+        strip.set_colorkey(colorkey)
+        areas = {}
+
+        x = 0
+        for char in character_string:
+            image = self.image_dict[char]
+            strip.blit(image, (x, 0))
+            areas[char] = pg.Rect(x, 0, image.get_width(), image.get_height())
+            x += image.get_width()
+
+        OverheadInfo.glyph_strip = strip
+        OverheadInfo.glyph_areas = areas
+
 
     def get_image(self, x, y, width, height):
         """Extracts image from sprite sheet"""
-        image = pg.Surface([width, height])
-        rect = image.get_rect()
-
-        image.blit(self.sprite_sheet, (0, 0), (x, y, width, height))
-        image.set_colorkey((92, 148, 252))
-        image = pg.transform.scale(image,
-                                   (int(rect.width*2.9),
-                                    int(rect.height*2.9)))
-        return image
+        return tools.get_image(self.sprite_sheet, x, y, width, height,
+                               (92, 148, 252), 2.9)
 
 
     def create_score_group(self):
@@ -154,7 +222,8 @@ class OverheadInfo(object):
     def create_label(self, label_list, string, x, y):
         """Creates a label (WORLD, TIME, MARIO)"""
         for letter in string:
-            label_list.append(Character(self.image_dict[letter]))
+            label_list.append(Character(self.image_dict[letter], letter,
+                                        self.glyph_areas[letter]))
 
         self.set_label_rects(label_list, x, y)
 
@@ -164,15 +233,26 @@ class OverheadInfo(object):
         for i, letter in enumerate(label_list):
             letter.rect.x = x + ((letter.rect.width + 3) * i)
             letter.rect.y = y
-            if letter.image == self.image_dict['-']:
+            if letter.char == '-':
                 letter.rect.y += 7
                 letter.rect.x += 2
 
 
+    def set_character(self, letter, char):
+        """Points an existing Character at a different glyph and remembers
+        where it sits so dirty rect renderers can repaint it"""
+        if letter.char != char:
+            self.changed_rects.append(letter.rect.copy())
+            letter.char = char
+            letter.image = self.image_dict[char]
+            letter.area = self.glyph_areas[char]
+
+
     def create_coin_counter(self):
         """Creates the info that tracks the number of coins Mario collects"""
         self.coin_count_images = []
         self.create_label(self.coin_count_images, '*00', 300, 55)
+        self.set_coin_label()
 
 
     def create_flashing_coin(self):
@@ -223,6 +303,7 @@ class OverheadInfo(object):
         self.create_label(player_two_game, '2 PLAYER GAME', 272, 405)
         self.create_label(top, 'TOP - ', 290, 465)
         self.create_label(top_score, '000000', 400, 465)
+        self.update_score_images(top_score, self.top_score)
 
         self.main_menu_labels = [player_one_game, player_two_game,
                                  top, top_score]
@@ -237,20 +318,16 @@ class OverheadInfo(object):
     def handle_level_state(self, level_info):
         """Updates info based on what state the game is in"""
         if self.state == c.MAIN_MENU:
-            self.score = level_info[c.SCORE]
-            self.update_score_images(self.score_images, self.score)
-            self.update_score_images(self.main_menu_labels[3], self.top_score)
+            self.update_score(level_info)
             self.update_coin_total(level_info)
             self.flashing_coin.update(level_info[c.CURRENT_TIME])
 
         elif self.state == c.LOAD_SCREEN:
-            self.score = level_info[c.SCORE]
-            self.update_score_images(self.score_images, self.score)
+            self.update_score(level_info)
             self.update_coin_total(level_info)
 
         elif self.state == c.LEVEL:
-            self.score = level_info[c.SCORE]
-            self.update_score_images(self.score_images, self.score)
+            self.update_score(level_info)
             if level_info[c.LEVEL_STATE] != c.FROZEN \
                     and self.mario.state != c.WALKING_TO_CASTLE \
                     and self.mario.state != c.END_OF_LEVEL_FALL \
@@ -260,20 +337,17 @@ class OverheadInfo(object):
             self.flashing_coin.update(level_info[c.CURRENT_TIME])
 
         elif self.state == c.TIME_OUT:
-            self.score = level_info[c.SCORE]
-            self.update_score_images(self.score_images, self.score)
+            self.update_score(level_info)
             self.update_coin_total(level_info)
 
         elif self.state == c.GAME_OVER:
-            self.score = level_info[c.SCORE]
-            self.update_score_images(self.score_images, self.score)
+            self.update_score(level_info)
             self.update_coin_total(level_info)
 
         elif self.state == c.FAST_COUNT_DOWN:
             level_info[c.SCORE] += 50
-            self.score = level_info[c.SCORE]
             self.update_count_down_clock(level_info)
-            self.update_score_images(self.score_images, self.score)
+            self.update_score(level_info)
             self.update_coin_total(level_info)
             self.flashing_coin.update(level_info[c.CURRENT_TIME])
             if self.time == 0:
@@ -283,14 +357,19 @@ class OverheadInfo(object):
             self.flashing_coin.update(level_info[c.CURRENT_TIME])
 
 
+    def update_score(self, level_info):
+        """Redraws the score digits if the score has changed"""
+        if level_info[c.SCORE] != self.score:
+            self.score = level_info[c.SCORE]
+            self.update_score_images(self.score_images, self.score)
+
+
     def update_score_images(self, images, score):
         """Updates what numbers are to be blitted for the score"""
         index = len(images) - 1
 
         for digit in reversed(str(score)):
-            rect = images[index].rect
-            images[index] = Character(self.image_dict[digit])
-            images[index].rect = rect
+            self.set_character(images[index], digit)
             index -= 1
 
 
@@ -298,25 +377,26 @@ class OverheadInfo(object):
         """Updates current time"""
         if self.state == c.FAST_COUNT_DOWN:
             self.time -= 1
-
         elif (level_info[c.CURRENT_TIME] - self.current_time) > 400:
             self.current_time = level_info[c.CURRENT_TIME]
             self.time -= 1
-        self.count_down_images = []
-        self.create_label(self.count_down_images, str(self.time), 645, 55)
-        if len(self.count_down_images) < 2:
-            for i in range(2):
-                self.count_down_images.insert(0, Character(self.image_dict['0']))
-            self.set_label_rects(self.count_down_images, 645, 55)
-        elif len(self.count_down_images) < 3:
-            self.count_down_images.insert(0, Character(self.image_dict['0']))
-            self.set_label_rects(self.count_down_images, 645, 55)
+        else:
+            return
+
+        for letter, digit in zip(self.count_down_images,
+                                 str(self.time).zfill(3)):
+            self.set_character(letter, digit)
 
 
     def update_coin_total(self, level_info):
         """Updates the coin total and adjusts label accordingly"""
-        self.coin_total = level_info[c.COIN_TOTAL]
+        if level_info[c.COIN_TOTAL] != self.coin_total:
+            self.coin_total = level_info[c.COIN_TOTAL]
+            self.set_coin_label()
+
 
+    def set_coin_label(self):
+        """Points the coin counter characters at the current coin total"""
         coin_string = str(self.coin_total)
         if len(coin_string) < 2:
             coin_string = '*0' + coin_string
@@ -325,12 +405,8 @@ class OverheadInfo(object):
         else:
             coin_string = '*' + coin_string
 
-        x = self.coin_count_images[0].rect.x
-        y = self.coin_count_images[0].rect.y
-
-        self.coin_count_images = []
-
-        self.create_label(self.coin_count_images, coin_string, x, y)
+        for letter, char in zip(self.coin_count_images, coin_string):
+            self.set_character(letter, char)
 
 
     def draw(self, surface):
@@ -357,18 +433,18 @@ class OverheadInfo(object):
     def draw_main_menu_info(self, surface):
         """Draws info for main menu"""
         for info in self.score_images:
-            surface.blit(info.image, info.rect)
+            surface.blit(self.glyph_strip, info.rect, info.area)
 
         for label in self.main_menu_labels:
             for letter in label:
-                surface.blit(letter.image, letter.rect)
+                surface.blit(self.glyph_strip, letter.rect, letter.area)
 
         for character in self.coin_count_images:
-            surface.blit(character.image, character.rect)
+            surface.blit(self.glyph_strip, character.rect, character.area)
 
         for label in self.label_list:
             for letter in label:
-                surface.blit(letter.image, letter.rect)
+                surface.blit(self.glyph_strip, letter.rect, letter.area)
 
         surface.blit(self.flashing_coin.image, self.flashing_coin.rect)
 
@@ -376,24 +452,24 @@ class OverheadInfo(object):
     def draw_loading_screen_info(self, surface):
         """Draws info for loading screen"""
         for info in self.score_images:
-            surface.blit(info.image, info.rect)
+            surface.blit(self.glyph_strip, info.rect, info.area)
 
         for word in self.center_labels:
             for letter in word:
-                surface.blit(letter.image, letter.rect)
+                surface.blit(self.glyph_strip, letter.rect, letter.area)
 
         for word in self.life_total_label:
-            surface.blit(word.image, word.rect)
+            surface.blit(self.glyph_strip, word.rect, word.area)
 
         surface.blit(self.mario_image, self.mario_rect)
         surface.blit(self.life_times_image, self.life_times_rect)
 
         for character in self.coin_count_images:
-            surface.blit(character.image, character.rect)
+            surface.blit(self.glyph_strip, character.rect, character.area)
 
         for label in self.label_list:
             for letter in label:
-                surface.blit(letter.image, letter.rect)
+                surface.blit(self.glyph_strip, letter.rect, letter.area)
 
         surface.blit(self.flashing_coin.image, self.flashing_coin.rect)
 
@@ -401,17 +477,17 @@ class OverheadInfo(object):
     def draw_level_screen_info(self, surface):
         """Draws info during regular game play"""
         for info in self.score_images:
-            surface.blit(info.image, info.rect)
+            surface.blit(self.glyph_strip, info.rect, info.area)
 
         for digit in self.count_down_images:
-                surface.blit(digit.image, digit.rect)
+                surface.blit(self.glyph_strip, digit.rect, digit.area)
 
         for character in self.coin_count_images:
-            surface.blit(character.image, character.rect)
+            surface.blit(self.glyph_strip, character.rect, character.area)
 
         for label in self.label_list:
             for letter in label:
-                surface.blit(letter.image, letter.rect)
+                surface.blit(self.glyph_strip, letter.rect, letter.area)
 
         surface.blit(self.flashing_coin.image, self.flashing_coin.rect)
 
@@ -419,18 +495,18 @@ class OverheadInfo(object):
     def draw_game_over_screen_info(self, surface):
         """Draws info when game over"""
         for info in self.score_images:
-            surface.blit(info.image, info.rect)
+            surface.blit(self.glyph_strip, info.rect, info.area)
 
         for word in self.game_over_label:
             for letter in word:
-                surface.blit(letter.image, letter.rect)
+                surface.blit(self.glyph_strip, letter.rect, letter.area)
 
         for character in self.coin_count_images:
-            surface.blit(character.image, character.rect)
+            surface.blit(self.glyph_strip, character.rect, character.area)
 
         for label in self.label_list:
             for letter in label:
-                surface.blit(letter.image, letter.rect)
+                surface.blit(self.glyph_strip, letter.rect, letter.area)
 
         surface.blit(self.flashing_coin.image, self.flashing_coin.rect)
 
@@ -438,18 +514,18 @@ class OverheadInfo(object):
     def draw_time_out_screen_info(self, surface):
         """Draws info when on the time out screen"""
         for info in self.score_images:
-            surface.blit(info.image, info.rect)
+            surface.blit(self.glyph_strip, info.rect, info.area)
 
         for word in self.time_out_label:
             for letter in word:
-                surface.blit(letter.image, letter.rect)
+                surface.blit(self.glyph_strip, letter.rect, letter.area)
 
         for character in self.coin_count_images:
-            surface.blit(character.image, character.rect)
+            surface.blit(self.glyph_strip, character.rect, character.area)
 
         for label in self.label_list:
             for letter in label:
-                surface.blit(letter.image, letter.rect)
+                surface.blit(self.glyph_strip, letter.rect, letter.area)
 
         surface.blit(self.flashing_coin.image, self.flashing_coin.rect)
 
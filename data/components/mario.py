@@ -16,6 +16,7 @@ class Mario(pg.sprite.Sprite):
         self.setup_forces()
         self.setup_counters()
         self.load_images_from_sheet()
+        self.make_images_opaque()
 
         self.state = c.WALK
         self.image = self.right_frames[self.frame_index]
@@ -25,6 +26,19 @@ class Mario(pg.sprite.Sprite):
         self.key_timer = 0
 
 
+    @property
+    def image(self):
+        """The current frame, or a blank one of the same size while
+        hurt_invincible_check has it blinked out"""
+        if self.current_frame in self.hidden_frames:
+            return tools.get_blank_image(self.current_frame.get_size())
+        return self.current_frame
+
+    @image.setter
+    def image(self, frame):
+        self.current_frame = frame
+
+
     def setup_timers(self):
         """Sets up timers for animations"""
         self.walking_timer = 0
@@ -288,39 +302,39 @@ class Mario(pg.sprite.Sprite):
         #frames but are simply reversed.
 
         for frame in self.right_small_normal_frames:
-            new_image = pg.transform.flip(frame, True, False)
+            new_image = tools.flip_image(frame, True, False)
             self.left_small_normal_frames.append(new_image)
 
         for frame in self.right_small_green_frames:
-            new_image = pg.transform.flip(frame, True, False)
+            new_image = tools.flip_image(frame, True, False)
             self.left_small_green_frames.append(new_image)
 
         for frame in self.right_small_red_frames:
-            new_image = pg.transform.flip(frame, True, False)
+            new_image = tools.flip_image(frame, True, False)
             self.left_small_red_frames.append(new_image)
 
         for frame in self.right_small_black_frames:
-            new_image = pg.transform.flip(frame, True, False)
+            new_image = tools.flip_image(frame, True, False)
             self.left_small_black_frames.append(new_image)
 
         for frame in self.right_big_normal_frames:
-            new_image = pg.transform.flip(frame, True, False)
+            new_image = tools.flip_image(frame, True, False)
             self.left_big_normal_frames.append(new_image)
 
         for frame in self.right_big_green_frames:
-            new_image = pg.transform.flip(frame, True, False)
+            new_image = tools.flip_image(frame, True, False)
             self.left_big_green_frames.append(new_image)
 
         for frame in self.right_big_red_frames:
-            new_image = pg.transform.flip(frame, True, False)
+            new_image = tools.flip_image(frame, True, False)
             self.left_big_red_frames.append(new_image)
 
         for frame in self.right_big_black_frames:
-            new_image = pg.transform.flip(frame, True, False)
+            new_image = tools.flip_image(frame, True, False)
             self.left_big_black_frames.append(new_image)
 
         for frame in self.right_fire_frames:
-            new_image = pg.transform.flip(frame, True, False)
+            new_image = tools.flip_image(frame, True, False)
             self.left_fire_frames.append(new_image)
 
 
@@ -385,15 +399,8 @@ class Mario(pg.sprite.Sprite):
 
     def get_image(self, x, y, width, height):
         """Extracts image from sprite sheet"""
-        image = pg.Surface([width, height])
-        rect = image.get_rect()
-
-        image.blit(self.sprite_sheet, (0, 0), (x, y, width, height))
-        image.set_colorkey(c.BLACK)
-        image = pg.transform.scale(image,
-                                   (int(rect.width*c.SIZE_MULTIPLIER),
-                                    int(rect.height*c.SIZE_MULTIPLIER)))
-        return image
+        return tools.get_image(self.sprite_sheet, x, y, width, height,
+                               c.BLACK, c.SIZE_MULTIPLIER)
 
 
     def update(self, keys, game_info, fire_group):
@@ -1085,9 +1092,14 @@ class Mario(pg.sprite.Sprite):
                 self.hurt_invincible = False
                 self.hurt_invisible_timer = 0
                 self.hurt_invisible_timer2 = 0
-                for frames in self.all_images:
-                    for image in frames:
-                        image.set_alpha(255)
+                self.make_images_opaque()
+
+
+    def make_images_opaque(self):
+        """Undoes any blinking from hurt_invincible_check.  Blinking is
+        kept per Mario rather than set on the frames, which are shared
+        through the frame cache."""
+        self.hidden_frames = {}
 
 
     def hurt_invincible_check(self):
@@ -1095,9 +1107,9 @@ class Mario(pg.sprite.Sprite):
         if self.hurt_invisible_timer == 0:
             self.hurt_invisible_timer = self.current_time
         elif (self.current_time - self.hurt_invisible_timer) < 35:
-            self.image.set_alpha(0)
+            self.hidden_frames[self.current_frame] = True
         elif (self.current_time - self.hurt_invisible_timer) < 70:
-            self.image.set_alpha(255)
+            self.hidden_frames.pop(self.current_frame, None)
             self.hurt_invisible_timer = self.current_time
 
 
@@ -34,6 +34,9 @@ BRICK_SIZE_MULTIPLIER = 2.69
 BACKGROUND_MULTIPLER = 2.679
 GROUND_HEIGHT = SCREEN_HEIGHT - 62
 
+#How far a bumped brick or coin box can move from where it rests
+BUMP_PADDING = 25
+
 #MARIO FORCES
 WALK_ACCEL = .15
 RUN_ACCEL = 20
@@ -162,6 +165,11 @@ TIME_OUT = 'time out'
 GAME_OVER = 'game over'
 LEVEL1 = 'level1'
 
+#RENDER MODES
+RENDER_FULL = 'full'
+RENDER_DIRTY = 'dirty'
+RENDER_NONE = 'none'
+
 #SOUND STATEZ
 NORMAL = 'normal'
 STAGE_CLEAR = 'stage clear'
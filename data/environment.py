@@ -0,0 +1,224 @@
+__author__ = 'justinarmstrong'
+
+"""
+A reset/step environment around Level1 for driving the game from code.
+It never reads the keyboard or draws to the display: keys come from a
+fixed list of actions, time from a FixedStepClock, and frames are drawn
+to an offscreen surface of the screen's size.
+"""
+
+import numpy as np
+import pygame as pg
+from . import setup, tools
+from . import constants as c
+from .observation import PixelObserver
+from .states import level1
+
+
+#Each action is the set of keybinding names held down while it is taken
+ACTIONS = [(),
+           ('right',),
+           ('right', 'jump'),
+           ('right', 'action'),
+           ('right', 'jump', 'action'),
+           ('jump',),
+           ('left',),
+           ('left', 'jump'),
+           ('down',)]
+
+NEW_GAME_INFO = {c.COIN_TOTAL: 0,
+                 c.SCORE: 0,
+                 c.LIVES: 3,
+                 c.TOP_SCORE: 0,
+                 c.CURRENT_TIME: 0.0,
+                 c.LEVEL_STATE: None,
+                 c.CAMERA_START_X: 0,
+                 c.MARIO_DEAD: False}
+
+
+def get_action_keys(action):
+    """The KeyState for an entry of ACTIONS"""
+    mask = 0
+    for name in action:
+        mask |= tools.KeyState.bits[tools.keybinding[name]]
+    return tools.KeyState(mask)
+
+
+class Level1Env(object):
+    """One level of the game behind reset() and step(action).  Each step
+    holds the action's keys for frame_skip frames.  The reward is how far
+    Mario moved right plus how much the score went up, and an episode ends
+    when Mario dies or the level is over.  Observations are the drawn
+    frame as a new (height, width, 3) array, or, given an observer from
+    data.observation, the observer's array refilled in place.
+
+    Only the last frame of a step is drawn; the ones before it are just
+    simulated.  With max_pool the last two frames are drawn and the
+    observation is their per-pixel maximum, so sprites that flicker from
+    frame to frame still show up.  It needs pixel observations."""
+    def __init__(self, frame_skip=1, render_mode=c.RENDER_FULL, observer=None,
+                 max_pool=False):
+        setup.init(True)
+        if max_pool and not (observer is None or
+                             isinstance(observer, PixelObserver)):
+            raise ValueError('max_pool needs pixel observations')
+        self.frame_skip = frame_skip
+        self.observer = observer
+        self.max_pool = max_pool
+        self.surface = pg.Surface(c.SCREEN_SIZE, 0, setup.SCREEN)
+        self.previous_surface = None
+        self.pooled = False
+        if max_pool:
+            self.previous_surface = pg.Surface(c.SCREEN_SIZE, 0, setup.SCREEN)
+            if observer is not None:
+                self.pool_buffer = np.zeros(observer.shape, np.uint8)
+        self.level = level1.Level1(render_mode)
+        self.action_keys = [get_action_keys(action) for action in ACTIONS]
+        self.clock = None
+        self.frame = 0
+        self.done = True
+
+
+    def reset(self):
+        """Starts a new game from the beginning of the level and returns
+        the first observation"""
+        self.clock = tools.FixedStepClock()
+        self.level.startup(self.clock.get_ticks(), dict(NEW_GAME_INFO))
+        self.level.blit_everything(self.surface)
+        self.frame = 0
+        self.done = False
+        self.pooled = False
+        return self.get_observation()
+
+
+    def step(self, action):
+        """Holds down the keys of ACTIONS[action] for frame_skip frames.
+        Returns the observation, reward, whether the episode is over, and
+        a dict of extra info."""
+        reward = self.advance(action)
+        return self.get_observation(), reward, self.done, self.get_info()
+
+
+    def advance(self, action):
+        """Plays a step without building its observation and returns the
+        reward"""
+        if self.done:
+            raise RuntimeError('step() called on a finished episode; '
+                               'call reset() first')
+        keys = self.action_keys[action]
+        start_x = self.level.mario.rect.x
+        start_score = self.level.game_info[c.SCORE]
+
+        last = self.frame_skip - 1
+        pooled = last - 1 if self.max_pool else last
+        self.pooled = False
+        for i in range(self.frame_skip):
+            self.clock.tick()
+            if i >= pooled:
+                self.level.update(self.surface, keys, self.clock.get_ticks())
+            else:
+                self.level.simulate(keys, self.clock.get_ticks())
+            self.frame += 1
+            self.done = self.is_done()
+            if self.done:
+                if i < pooled:
+                    self.level.blit_everything(self.surface)
+                break
+            if i == last - 1 and self.max_pool:
+                self.previous_surface.blit(self.surface, (0, 0))
+                self.pooled = True
+
+        return (self.level.mario.rect.x - start_x) + \
+               (self.level.game_info[c.SCORE] - start_score)
+
+
+    def is_done(self):
+        """Whether Mario has died or the level wants to move on"""
+        return self.level.mario.dead or self.level.done
+
+
+    def get_observation(self, out=None):
+        """The frame last drawn, maxed with the one before it if both
+        were drawn for max_pool.  An observer fills out if given."""
+        if self.observer is None:
+            observation = pg.surfarray.array3d(self.surface).swapaxes(0, 1)
+            if self.pooled:
+                previous = pg.surfarray.pixels3d(self.previous_surface)
+                np.maximum(observation, previous.swapaxes(0, 1),
+                           out=observation)
+                del previous
+            return observation
+
+        observation = self.observer.observe_env(self, out)
+        if self.pooled:
+            self.observer.observe(self.previous_surface, self.pool_buffer)
+            np.maximum(observation, self.pool_buffer, out=observation)
+        return observation
+
+
+    def get_info(self):
+        """Progress details that are not part of the reward"""
+        level = self.level
+        return {'x': level.mario.rect.x,
+                'score': level.game_info[c.SCORE],
+                'coins': level.game_info[c.COIN_TOTAL],
+                'time': level.overhead_info_display.time,
+                'frame': self.frame,
+                'flag': level.state in (c.IN_CASTLE, c.FLAG_AND_FIREWORKS) or
+                        level.mario.state in (c.FLAGPOLE,
+                                              c.WALKING_TO_CASTLE,
+                                              c.END_OF_LEVEL_FALL)}
+
+
+class VectorLevel1Env(object):
+    """num_envs Level1Envs stepped together in one process.  The levels
+    share the loaded sheets, sounds and frame cache, and each draws to its
+    own offscreen surface.  Observations, rewards and dones come back as
+    arrays with one row per level, refilled in place on every call, so
+    copy them if they need to outlive the next step.  A level whose
+    episode ends is reset straight away; its row of infos is the one from
+    the step that ended it.  observer decides the observations' size and
+    colour; by default they are full frames."""
+    def __init__(self, num_envs, frame_skip=1, render_mode=c.RENDER_FULL,
+                 observer=None, max_pool=False):
+        self.observer = observer or PixelObserver()
+        self.envs = [Level1Env(frame_skip, render_mode, self.observer, max_pool)
+                     for _ in range(num_envs)]
+        self.observations = np.zeros((num_envs,) + self.observer.shape,
+                                     self.observer.output.dtype)
+        self.rewards = np.zeros(num_envs, np.float32)
+        self.dones = np.zeros(num_envs, np.bool_)
+        self.infos = [None] * num_envs
+
+
+    def __len__(self):
+        return len(self.envs)
+
+
+    def reset(self):
+        """Starts every level over and returns the first observations"""
+        for i, env in enumerate(self.envs):
+            env.reset()
+            self.infos[i] = env.get_info()
+            self.copy_observation(i)
+        self.rewards[:] = 0
+        self.dones[:] = False
+        return self.observations
+
+
+    def step(self, actions):
+        """Takes actions[i] in level i.  Returns the observations,
+        rewards, dones and infos."""
+        for i, env in enumerate(self.envs):
+            self.rewards[i] = env.advance(actions[i])
+            self.dones[i] = env.done
+            self.infos[i] = env.get_info()
+            if env.done:
+                env.reset()
+            self.copy_observation(i)
+        return self.observations, self.rewards, self.dones, self.infos
+
+
+    def copy_observation(self, i):
+        """Reads level i's frame into its row of observations"""
+        self.envs[i].get_observation(self.observations[i])
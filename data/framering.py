@@ -0,0 +1,92 @@
+__author__ = 'justinarmstrong'
+
+"""
+A ring of frames in shared memory.  Worker processes draw their levels
+straight into it and the process that steps them reads the frames back as
+NumPy views, so no pixels are ever copied or sent through a pipe.  Needs
+Python 3.8 for multiprocessing.shared_memory.
+"""
+
+import numpy as np
+import pygame as pg
+from multiprocessing import shared_memory
+from . import constants as c
+
+
+class FrameRing(object):
+    """num_slots slots of num_rows frames each, one row per level.  Frames
+    are stored as 32 bit BGRA, the display's byte order with its spare
+    byte read as alpha, since pygame has no BGRX format for frombuffer().
+    The level draws into a surface made over one as fast as into an
+    ordinary surface, and to the same pixels, but the surface has
+    per-pixel alpha that means nothing, so it is only ever drawn into,
+    never blitted from.  Every frame has a sequence number that is odd
+    while it is being drawn and goes up again when the drawing is done, so
+    a reader can tell whether a frame it holds a view of has been drawn
+    over since."""
+    def __init__(self, num_slots, num_rows, size=c.SCREEN_SIZE, name=None):
+        width, height = size
+        self.num_slots = num_slots
+        self.num_rows = num_rows
+        self.size = size
+        self.owner = name is None
+        header_size = (num_slots*num_rows*8 + 63) // 64 * 64
+        frames_size = num_slots*num_rows*width*height*4
+        self.memory = shared_memory.SharedMemory(name, self.owner,
+                                                 header_size + frames_size)
+        self.name = self.memory.name
+        self.sequences = np.ndarray((num_slots, num_rows), np.int64,
+                                    self.memory.buf)
+        self.frames = np.ndarray((num_slots, num_rows, height, width, 4),
+                                 np.uint8, self.memory.buf, header_size)
+        if self.owner:
+            self.sequences[:] = 0
+
+
+    def __getstate__(self):
+        return self.num_slots, self.num_rows, self.size, self.name
+
+
+    def __setstate__(self, state):
+        num_slots, num_rows, size, name = state
+        self.__init__(num_slots, num_rows, size, name)
+
+
+    def get_surface(self, slot, row):
+        """A surface whose pixels are the frame at slot, row.  It has
+        SRCALPHA set; draw into it, but do not blit it anywhere."""
+        return pg.image.frombuffer(self.frames[slot, row], self.size, 'BGRA')
+
+
+    def begin_write(self, slot, row):
+        self.sequences[slot, row] += 1
+
+
+    def end_write(self, slot, row):
+        """Marks a frame as drawn and returns its new sequence number"""
+        self.sequences[slot, row] += 1
+        return int(self.sequences[slot, row])
+
+
+    def get_frames(self, slot):
+        """The frames in a slot as a (rows, height, width, 3) RGB view"""
+        return self.frames[slot, :, :, :, 2::-1]
+
+
+    def is_current(self, slot, sequences):
+        """Whether the frames in slot still have the given sequence
+        numbers, meaning nothing has drawn over them"""
+        return bool((self.sequences[slot] == sequences).all())
+
+
+    def close(self):
+        """Lets go of the shared memory, and frees it if this ring made it.
+        While views of it are still held it stays mapped until they go."""
+        self.sequences = None
+        self.frames = None
+        try:
+            self.memory.close()
+        except BufferError:
+            pass
+        if self.owner:
+            self.memory.unlink()
@@ -1,6 +1,5 @@
 __author__ = 'justinarmstrong'
 
-import pygame as pg
 from . import setup
 from . import constants as c
 
@@ -19,12 +18,12 @@ class Sound(object):
     def set_music_mixer(self):
         """Sets music for level"""
         if self.overhead_info.state == c.LEVEL:
-            pg.mixer.music.load(self.music_dict['main_theme'])
-            pg.mixer.music.play()
+            setup.MUSIC_PLAYER.load(self.music_dict['main_theme'])
+            setup.MUSIC_PLAYER.play()
             self.state = c.NORMAL
         elif self.overhead_info.state == c.GAME_OVER:
-            pg.mixer.music.load(self.music_dict['game_over'])
-            pg.mixer.music.play()
+            setup.MUSIC_PLAYER.load(self.music_dict['game_over'])
+            setup.MUSIC_PLAYER.play()
             self.state = c.GAME_OVER
 
 
@@ -63,7 +62,7 @@ class Sound(object):
                 self.state = c.WORLD_CLEAR
 
         elif self.state == c. TIME_WARNING:
-            if pg.mixer.music.get_busy() == 0:
+            if setup.MUSIC_PLAYER.get_busy() == 0:
                 self.play_music('main_theme_sped_up', c.SPED_UP_NORMAL)
             elif self.mario.dead:
                 self.play_music('death', c.MARIO_DEAD)
@@ -90,13 +89,13 @@ class Sound(object):
 
     def play_music(self, key, state):
         """Plays new music"""
-        pg.mixer.music.load(self.music_dict[key])
-        pg.mixer.music.play()
+        setup.MUSIC_PLAYER.load(self.music_dict[key])
+        setup.MUSIC_PLAYER.play()
         self.state = state
 
     def stop_music(self):
         """Stops playback"""
-        pg.mixer.music.stop()
+        setup.MUSIC_PLAYER.stop()
 
 
 
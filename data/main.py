@@ -1,21 +1,62 @@
 __author__ = 'justinarmstrong'
 
 from . import setup,tools
+from . import replay as replays
 from .states import main_menu,load_screen,level1
 from . import constants as c
 
 
-def main():
-    """Add states to control here."""
-    run_it = tools.Control(setup.ORIGINAL_CAPTION)
-    state_dict = {c.MAIN_MENU: main_menu.Menu(),
-                  c.LOAD_SCREEN: load_screen.LoadScreen(),
-                  c.TIME_OUT: load_screen.TimeOut(),
-                  c.GAME_OVER: load_screen.GameOver(),
-                  c.LEVEL1: level1.Level1()}
+def create_states(render_mode=c.RENDER_FULL):
+    """Creates every state of the game, keyed by name"""
+    return {c.MAIN_MENU: main_menu.Menu(),
+            c.LOAD_SCREEN: load_screen.LoadScreen(),
+            c.TIME_OUT: load_screen.TimeOut(),
+            c.GAME_OVER: load_screen.GameOver(),
+            c.LEVEL1: level1.Level1(render_mode)}
 
-    run_it.setup_states(state_dict, c.MAIN_MENU)
-    run_it.main()
 
+def main(headless=False, max_frames=None, fixed_step=None,
+         render_mode=c.RENDER_FULL, record=None, replay=None, smooth=False,
+         profiler=None):
+    """Add states to control here.  Returns the Control object once the
+    game loop exits.  fixed_step defaults to on when headless.  record
+    saves a replay file of the run; replay plays one back, and the
+    Control's recorder can then be checked against it.  smooth steps the
+    game at a fixed 60 Hz and draws interpolated frames in between.  A
+    profiler times the phases of every frame.
 
+    Nothing presses a key in a headless run, so one that is not a replay
+    skips the main menu and starts at the load screen before the level.
+    Give it max_frames: once the game is over it is back in the menu for
+    good."""
+    setup.init(headless)
+    if replay is not None:
+        replay = replays.Replay.load(replay)
+        game_clock = replay
+        max_frames = len(replay)
+        start_state = replay.get_start_state()
+    else:
+        if fixed_step is None:
+            fixed_step = headless or smooth
+        if fixed_step:
+            game_clock = tools.FixedStepClock()
+        else:
+            game_clock = tools.WallClock()
+        start_state = c.LOAD_SCREEN if headless else c.MAIN_MENU
+    run_it = tools.Control(setup.ORIGINAL_CAPTION, headless, max_frames,
+                           game_clock)
+    if replay is not None or record is not None:
+        run_it.recorder = replays.Recorder(start_state)
+    run_it.input_source = replay
+    run_it.fixed_timestep = smooth
+    if profiler is not None:
+        run_it.profiler = profiler
 
+    states = create_states(render_mode)
+    if start_state != c.MAIN_MENU:
+        states[start_state].startup(0.0, states[c.MAIN_MENU].cleanup())
+    run_it.setup_states(states, start_state)
+    run_it.main()
+    if record is not None:
+        run_it.recorder.save(record)
+    return run_it
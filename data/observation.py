@@ -0,0 +1,385 @@
+__author__ = 'justinarmstrong'
+
+"""
+Turns the level into NumPy observations without allocating anything per
+frame.  PixelObserver reads the drawn frame in place from the surface it
+was drawn on, shrinks it by picking rows and columns, optionally turns it
+grey, and writes it into a buffer made once up front.  TileGridObserver
+skips the pixels altogether and describes what is in each tile around
+Mario, and RamObserver packs the state of play into one fixed-layout
+record, much like reading the NES's RAM.
+"""
+
+import sys
+import math
+import weakref
+import numpy as np
+import pygame as pg
+from . import constants as c
+
+
+#Integer luma weights out of 256 (ITU-R 601)
+GRAY_WEIGHTS = (77, 150, 29)
+
+#One tile of the level's background, in screen pixels
+TILE_SIZE = 16 * c.BACKGROUND_MULTIPLER
+
+#What TileGridObserver puts in each tile
+EMPTY = 0
+SOLID = 1
+BRICK = 2
+COIN_BOX = 3
+USED_BOX = 4
+ENEMY = 5
+SHELL = 6
+POWERUP = 7
+MARIO = 8
+
+#Every state a sprite or the level can be in; RamObserver stores a state
+#as its position here, and 0 for anything not listed
+STATES = (c.STAND, c.WALK, c.JUMP, c.FALL, c.SMALL_TO_BIG, c.BIG_TO_FIRE,
+          c.BIG_TO_SMALL, c.FLAGPOLE, c.WALKING_TO_CASTLE, c.END_OF_LEVEL_FALL,
+          c.BOTTOM_OF_POLE, c.JUMPED_ON, c.DEATH_JUMP, c.SHELL_SLIDE,
+          c.FROZEN, c.NOT_FROZEN, c.IN_CASTLE, c.FLAG_AND_FIREWORKS)
+STATE_CODES = dict((state, i) for i, state in enumerate(STATES, 1))
+
+ENEMY_KINDS = {c.GOOMBA: 1, c.KOOPA: 2}
+
+MARIO_TIMERS = ('walking_timer', 'invincible_animation_timer',
+                'invincible_start_timer', 'fire_transition_timer',
+                'death_timer', 'transition_timer', 'last_fireball_time',
+                'hurt_invisible_timer', 'hurt_invisible_timer2',
+                'flag_pole_timer')
+
+MAX_ENEMIES = 8
+
+ENEMY_DTYPE = np.dtype([('kind', np.uint8),
+                        ('state', np.uint8),
+                        ('x', np.int32),
+                        ('y', np.int32),
+                        ('x_vel', np.float32),
+                        ('y_vel', np.float32)])
+
+RAM_DTYPE = np.dtype([('mario_x', np.int32),
+                      ('mario_y', np.int32),
+                      ('mario_x_vel', np.float32),
+                      ('mario_y_vel', np.float32),
+                      ('mario_state', np.uint8),
+                      ('facing_right', np.bool_),
+                      ('big', np.bool_),
+                      ('fire', np.bool_),
+                      ('invincible', np.bool_),
+                      ('hurt_invincible', np.bool_),
+                      ('dead', np.bool_),
+                      ('timers', np.float64, (len(MARIO_TIMERS),)),
+                      ('viewport_x', np.int32),
+                      ('level_state', np.uint8),
+                      ('clock', np.int16),
+                      ('current_time', np.float64),
+                      ('score', np.int32),
+                      ('coins', np.int16),
+                      ('lives', np.int16),
+                      ('enemy_count', np.uint8),
+                      ('enemies', ENEMY_DTYPE, (MAX_ENEMIES,))])
+
+
+def get_view(surface):
+    """The surface's pixels as a (height, width, 3) array that shares its
+    memory.  The surface stays locked, and cannot be drawn on, until every
+    view of it is gone."""
+    return pg.surfarray.pixels3d(surface).swapaxes(0, 1)
+
+
+def get_indexes(source, target):
+    """The step between source indexes if every factor-th one is taken,
+    otherwise the nearest neighbour source index of each target position"""
+    if source % target == 0:
+        return source // target
+    return np.arange(target) * source // target
+
+
+def get_rgb_bytes(surface):
+    """Slice of the red, green and blue bytes of a 32 bit pixel"""
+    red, green, blue = [shift // 8 for shift in surface.get_shifts()[:3]]
+    if sys.byteorder == 'big':
+        red, blue = 3 - red, 3 - blue
+    if blue > red:
+        return slice(red, blue + 1)
+    return slice(red, blue - 1 if blue else None, -1)
+
+
+class PixelObserver(object):
+    """Reads frames of source_size into a preallocated array of shape
+    (height, width, 3), or (height, width) when grayscale.  A shape that
+    divides the source evenly is read with plain strided slicing.  Any
+    other shape (84x84, or the NES's own 224x299) takes its pixels
+    straight out of the surface's 32 bit buffer through a map of flat
+    pixel indexes.  observe() returns the same array every time unless
+    given an out array to fill instead."""
+    def __init__(self, shape=None, grayscale=False, source_size=c.SCREEN_SIZE):
+        source_width, source_height = source_size
+        if shape is None:
+            shape = (source_height, source_width)
+        height, width = shape
+        self.grayscale = grayscale
+        self.rows = get_indexes(source_height, height)
+        self.columns = get_indexes(source_width, width)
+        self.mapped = isinstance(self.rows, np.ndarray) or \
+            isinstance(self.columns, np.ndarray)
+        if self.mapped:
+            self.rows = np.arange(height) * source_height // height
+            self.columns = np.arange(width) * source_width // width
+        self.pixel_indexes = None
+        self.pitch = None
+        self.shape = (height, width) if grayscale else (height, width, 3)
+        self.output = np.zeros(self.shape, np.uint8)
+        self.sampled = np.zeros((height, width, 3), np.uint8)
+        self.packed = np.zeros((height, width), np.uint32)
+        self.gray = np.zeros((height, width), np.uint16)
+        self.channel = np.zeros((height, width), np.uint16)
+
+
+    def get_pixel_indexes(self, surface):
+        """Flat indexes of the mapped pixels in a surface's buffer"""
+        pitch = surface.get_pitch() // 4
+        if pitch != self.pitch:
+            self.pitch = pitch
+            self.pixel_indexes = self.rows[:, np.newaxis]*pitch + self.columns
+        return self.pixel_indexes
+
+
+    def sample(self, surface, out):
+        """Picks the observation's pixels out of the frame on surface"""
+        if self.mapped and surface.get_bytesize() == 4 and \
+                surface.get_shifts()[:3] in ((16, 8, 0), (0, 8, 16)):
+            buffer = surface.get_view('1')
+            pixels = np.frombuffer(buffer, np.uint32)
+            np.take(pixels, self.get_pixel_indexes(surface), out=self.packed,
+                    mode='clip')
+            del pixels, buffer
+            channels = self.packed.view(np.uint8).reshape(out.shape[:2] + (4,))
+            np.copyto(out, channels[:, :, get_rgb_bytes(surface)])
+        else:
+            view = get_view(surface)
+            if self.mapped:
+                np.copyto(out, view[self.rows[:, np.newaxis], self.columns])
+            else:
+                np.copyto(out, view[::self.rows, ::self.columns])
+            del view
+
+
+    def to_gray(self, rgb, out):
+        """Writes the luma of an RGB array into out"""
+        gray = self.gray
+        gray.fill(0)
+        for i, weight in enumerate(GRAY_WEIGHTS):
+            np.copyto(self.channel, rgb[:, :, i])
+            self.channel *= weight
+            gray += self.channel
+        gray >>= 8
+        np.copyto(out, gray, casting='unsafe')
+
+
+    def observe_env(self, env, out=None):
+        return self.observe(env.surface, out)
+
+
+    def observe(self, surface, out=None):
+        """Reads the frame drawn on surface into out, or into this
+        observer's own array, and returns it"""
+        if out is None:
+            out = self.output
+        if self.grayscale:
+            self.sample(surface, self.sampled)
+            self.to_gray(self.sampled, out)
+        else:
+            self.sample(surface, out)
+        return out
+
+
+def get_tile_span(start, end):
+    """The tiles whose centres lie between two screen coordinates, or the
+    one tile under their middle if none do"""
+    first = int(round(start / TILE_SIZE))
+    last = int(round(end / TILE_SIZE))
+    if last <= first:
+        first = int((start + end) / 2 // TILE_SIZE)
+        last = first + 1
+    return first, last
+
+
+class TileLayers(object):
+    """The layers TileGridObserver keeps for one level, and the group
+    versions they were laid out for"""
+    def __init__(self):
+        self.solid = None
+        self.solid_key = None
+        self.blocks = None
+        self.blocks_key = None
+        self.openable = []
+
+
+class TileGridObserver(object):
+    """A (rows, columns) grid of tile codes around Mario, columns_behind of
+    them behind him, covering the level's full height.  The ground, pipes
+    and steps are laid out once per level; bricks and coin boxes are laid
+    over them again only when their groups gain or lose sprites.  Each
+    frame that layer is sliced around Mario and the moving sprites are
+    stamped on top, so an observation costs a few microseconds.  The
+    layers are kept per level, so one observer can serve every level of
+    a VectorLevel1Env."""
+    def __init__(self, columns=16, columns_behind=4, rows=14):
+        self.columns = columns
+        self.columns_behind = columns_behind
+        self.rows = rows
+        self.shape = (rows, columns)
+        self.output = np.zeros(self.shape, np.int8)
+        self.layers = weakref.WeakKeyDictionary()
+
+
+    def stamp(self, grid, rect, code, left=0):
+        """Fills the tiles a rect covers with code.  left is the grid's
+        first column in level tiles; grid columns may sit before it."""
+        first_row, last_row = get_tile_span(rect.top, rect.bottom)
+        first_column, last_column = get_tile_span(rect.left, rect.right)
+        first_column -= left
+        last_column -= left
+        grid[max(first_row, 0):max(last_row, 0),
+             max(first_column, 0):max(last_column, 0)] = code
+
+
+    def get_layers(self, level):
+        layers = self.layers.get(level)
+        if layers is None:
+            layers = self.layers[level] = TileLayers()
+        return layers
+
+
+    def get_solid_layer(self, level):
+        """The ground, pipes and steps of the whole level, with a screen's
+        worth of empty columns on both ends"""
+        layers = self.get_layers(level)
+        group = level.ground_step_pipe_group
+        key = (id(group), group.version)
+        if key != layers.solid_key:
+            width = int(math.ceil(level.level_rect.width / TILE_SIZE))
+            layers.solid = np.zeros((self.rows, width + 2*self.columns),
+                                    np.int8)
+            for sprite in group:
+                self.stamp(layers.solid, sprite.rect, SOLID, -self.columns)
+            layers.solid_key = key
+            layers.blocks_key = None
+        return layers.solid
+
+
+    def get_block_layer(self, level):
+        """The solid layer with bricks and coin boxes laid over it"""
+        solid = self.get_solid_layer(level)
+        layers = self.get_layers(level)
+        bricks = level.brick_group
+        boxes = level.coin_box_group
+        key = (id(level), id(bricks), bricks.version, id(boxes), boxes.version)
+        if key != layers.blocks_key:
+            layers.blocks = solid.copy()
+            layers.openable = []
+            for sprite in bricks:
+                self.stamp(layers.blocks, sprite.rect, BRICK, -self.columns)
+                if sprite.contents is not None:
+                    layers.openable.append((sprite, BRICK, None))
+            for sprite in boxes:
+                self.stamp(layers.blocks, sprite.rect, COIN_BOX, -self.columns)
+                layers.openable.append((sprite, COIN_BOX, None))
+            layers.blocks_key = key
+        openable = layers.openable
+        for i, (sprite, code, opened) in enumerate(openable):
+            if (sprite.state == c.OPENED) != opened:
+                opened = sprite.state == c.OPENED
+                self.stamp(layers.blocks, sprite.rect,
+                           USED_BOX if opened else code, -self.columns)
+                openable[i] = (sprite, code, opened)
+        return layers.blocks
+
+
+    def observe_env(self, env, out=None):
+        return self.observe(env.level, out)
+
+
+    def observe(self, level, out=None):
+        """Fills out, or this observer's own array, with the tiles around
+        Mario and returns it"""
+        if out is None:
+            out = self.output
+        blocks = self.get_block_layer(level)
+        mario = level.mario
+        left = int(mario.rect.centerx // TILE_SIZE) - self.columns_behind
+        start = min(max(left + self.columns, 0),
+                    blocks.shape[1] - self.columns)
+        left = start - self.columns
+        np.copyto(out, blocks[:self.rows, start:start + self.columns])
+
+        for enemy in level.enemy_group:
+            self.stamp(out, enemy.rect, ENEMY, left)
+        for shell in level.shell_group:
+            self.stamp(out, shell.rect, SHELL, left)
+        for powerup in level.powerup_group:
+            if powerup.name != c.FIREBALL:
+                self.stamp(out, powerup.rect, POWERUP, left)
+        self.stamp(out, mario.rect, MARIO, left)
+        return out
+
+
+class RamObserver(object):
+    """Packs Mario, the timers, the camera, the game_info counters and a
+    table of the first MAX_ENEMIES active enemies into one RAM_DTYPE
+    record.  enemy_count is how many were active, even past the table's
+    end.  Records are plain bytes, so tobytes() is enough to log or hash
+    one."""
+    def __init__(self):
+        self.shape = ()
+        self.output = np.zeros(self.shape, RAM_DTYPE)
+
+
+    def observe_env(self, env, out=None):
+        return self.observe(env.level, out)
+
+
+    def observe(self, level, out=None):
+        """Fills out, or this observer's own record, from the level and
+        returns it"""
+        if out is None:
+            out = self.output
+        mario = level.mario
+        game_info = level.game_info
+        out['mario_x'] = mario.rect.x
+        out['mario_y'] = mario.rect.y
+        out['mario_x_vel'] = mario.x_vel
+        out['mario_y_vel'] = mario.y_vel
+        out['mario_state'] = STATE_CODES.get(mario.state, 0)
+        out['facing_right'] = mario.facing_right
+        out['big'] = mario.big
+        out['fire'] = mario.fire
+        out['invincible'] = mario.invincible
+        out['hurt_invincible'] = mario.hurt_invincible
+        out['dead'] = mario.dead
+        out['timers'] = [getattr(mario, name) for name in MARIO_TIMERS]
+        out['viewport_x'] = level.viewport.x
+        out['level_state'] = STATE_CODES.get(level.state, 0)
+        out['clock'] = level.overhead_info_display.time
+        out['current_time'] = game_info[c.CURRENT_TIME]
+        out['score'] = game_info[c.SCORE]
+        out['coins'] = game_info[c.COIN_TOTAL]
+        out['lives'] = game_info[c.LIVES]
+
+        enemies = out['enemies']
+        count = 0
+        for group in (level.enemy_group, level.shell_group):
+            for enemy in group:
+                if count < MAX_ENEMIES:
+                    enemies[count] = (ENEMY_KINDS.get(enemy.name, 0),
+                                      STATE_CODES.get(enemy.state, 0),
+                                      enemy.rect.x, enemy.rect.y,
+                                      enemy.x_vel, enemy.y_vel)
+                count += 1
+        enemies[count:] = 0
+        out['enemy_count'] = count
+        return out
@@ -0,0 +1,252 @@
+__author__ = 'justinarmstrong'
+
+"""
+Times the phases of every frame.  Control and Level1 call start() and
+stop() around each phase and Control calls end_frame() once a frame is
+over; each phase's time for the frame then goes into a ring buffer of the
+last capacity frames it ran in.  Nothing is allocated per frame, so the
+profiler can stay on for a whole run.  TraceProfiler also writes every
+span out as a Chrome trace, which chrome://tracing and Perfetto open.
+"""
+
+import json
+import time
+import threading
+from array import array
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+timer = getattr(time, 'perf_counter', time.time)
+
+PERCENTILES = (50, 95, 99)
+BIN_WIDTH = 0.25
+BINS = 40
+
+
+class NullProfiler(object):
+    """What Control and the states hold when nothing is being profiled.
+    Callers check counting before gathering values for count()."""
+    counting = False
+
+    def start(self, phase):
+        pass
+
+    def stop(self, phase):
+        pass
+
+    def end_frame(self):
+        pass
+
+    def count(self, name, values):
+        pass
+
+
+class RingBuffer(object):
+    """The last capacity values written, oldest first"""
+    def __init__(self, capacity):
+        self.values = array('d', [0.0]) * capacity
+        self.count = 0
+
+    def append(self, value):
+        self.values[self.count % len(self.values)] = value
+        self.count += 1
+
+    def get_values(self):
+        capacity = len(self.values)
+        if self.count <= capacity:
+            return self.values[:self.count]
+        start = self.count % capacity
+        return self.values[start:] + self.values[:start]
+
+
+def get_percentile(ordered, percentile):
+    """Nearest rank percentile of a sorted sequence"""
+    if not ordered:
+        return 0.0
+    rank = int(round(percentile / 100.0 * len(ordered) + 0.5)) - 1
+    return ordered[min(max(rank, 0), len(ordered) - 1)]
+
+
+class FrameProfiler(object):
+    """Per phase frame times, in milliseconds, for the last capacity
+    frames each phase ran in.  A phase that runs several times in one
+    frame counts once, with the times added up."""
+    counting = False
+
+    def __init__(self, capacity=3600):
+        self.capacity = capacity
+        self.rings = {}
+        self.started = {}
+        self.frame_times = {}
+        self.frame_count = 0
+
+
+    def start(self, phase):
+        self.started[phase] = timer()
+
+
+    def stop(self, phase):
+        elapsed = timer() - self.started[phase]
+        self.frame_times[phase] = self.frame_times.get(phase, 0.0) + elapsed
+
+
+    def end_frame(self):
+        """Files this frame's phase times into their ring buffers"""
+        for phase, elapsed in self.frame_times.items():
+            ring = self.rings.get(phase)
+            if ring is None:
+                ring = self.rings[phase] = RingBuffer(self.capacity)
+            ring.append(elapsed * 1000.0)
+        self.frame_times.clear()
+        self.frame_count += 1
+
+
+    def count(self, name, values):
+        """Counters are only kept by TraceProfiler"""
+        pass
+
+
+    def get_samples(self, phase):
+        """A phase's recorded frame times, oldest first"""
+        ring = self.rings.get(phase)
+        return ring.get_values() if ring is not None else array('d')
+
+
+    def get_summary(self, phase):
+        """Count, mean, max and percentiles of a phase's frame times"""
+        ordered = sorted(self.get_samples(phase))
+        summary = {'count': len(ordered),
+                   'mean': sum(ordered) / len(ordered) if ordered else 0.0,
+                   'max': ordered[-1] if ordered else 0.0}
+        for percentile in PERCENTILES:
+            summary['p{}'.format(percentile)] = get_percentile(ordered,
+                                                               percentile)
+        return summary
+
+
+    def get_histogram(self, phase, bin_width=BIN_WIDTH, bins=BINS):
+        """How many of a phase's frame times fall into each bin_width ms
+        wide bin, with everything past the last bin counted in it"""
+        counts = [0] * bins
+        for value in self.get_samples(phase):
+            counts[min(int(value / bin_width), bins - 1)] += 1
+        return counts
+
+
+    def get_report(self):
+        """Summary and histogram of every phase, keyed by phase name"""
+        report = {}
+        for phase in self.rings:
+            report[phase] = self.get_summary(phase)
+            report[phase]['histogram'] = self.get_histogram(phase)
+        return report
+
+
+    def format_report(self):
+        """The summaries as a table, slowest phase first"""
+        columns = ['count', 'mean'] + ['p{}'.format(percentile)
+                                       for percentile in PERCENTILES] + ['max']
+        summaries = [(phase, self.get_summary(phase)) for phase in self.rings]
+        summaries.sort(key=lambda item: -item[1]['mean'])
+        lines = ['{:<26}'.format('phase (ms)') +
+                 ''.join('{:>9}'.format(name) for name in columns)]
+        for phase, summary in summaries:
+            lines.append('{:<26}{:>9}'.format(phase, summary['count']) +
+                         ''.join('{:>9.3f}'.format(summary[name])
+                                 for name in columns[1:]))
+        return '\n'.join(lines)
+
+
+    def save(self, filename):
+        """Writes get_report() to a JSON file"""
+        with open(filename, 'w') as report_file:
+            json.dump({'frames': self.frame_count,
+                       'bin width': BIN_WIDTH,
+                       'phases': self.get_report()},
+                      report_file, indent=2, sort_keys=True)
+
+
+class TraceProfiler(FrameProfiler):
+    """FrameProfiler that also writes every span, and every count() of
+    the entities on screen, to a Chrome trace event file.  Events are
+    handed to a writer thread every flush_frames frames, so the game only
+    ever appends to a list.  The file is in the JSON array format, which
+    trace viewers read even if the game died before close()."""
+    counting = True
+
+    def __init__(self, filename, capacity=3600, flush_frames=60):
+        FrameProfiler.__init__(self, capacity)
+        self.flush_frames = flush_frames
+        self.origin = timer()
+        self.events = []
+        self.pending = queue.Queue()
+        self.trace_file = open(filename, 'w')
+        self.trace_file.write('[\n')
+        self.writer = threading.Thread(target=self.write_events)
+        self.writer.daemon = True
+        self.writer.start()
+
+
+    def stop(self, phase):
+        now = timer()
+        started = self.started[phase]
+        elapsed = now - started
+        self.frame_times[phase] = self.frame_times.get(phase, 0.0) + elapsed
+        self.events.append(('X', phase, started, elapsed, self.frame_count))
+
+
+    def count(self, name, values):
+        self.events.append(('C', name, timer(), values, None))
+
+
+    def end_frame(self):
+        FrameProfiler.end_frame(self)
+        if self.frame_count % self.flush_frames == 0:
+            self.flush()
+
+
+    def flush(self):
+        """Hands the events so far to the writer thread"""
+        if self.events:
+            self.pending.put(self.events)
+            self.events = []
+
+
+    def format_event(self, event):
+        """One event as a line of Chrome trace JSON"""
+        kind, name, started, value, frame = event
+        timestamp = (started - self.origin) * 1e6
+        if kind == 'C':
+            return json.dumps({'name': name, 'ph': 'C', 'ts': timestamp,
+                               'pid': 1, 'args': value})
+        record = {'name': name, 'ph': 'X', 'ts': timestamp,
+                  'dur': value * 1e6, 'pid': 1, 'tid': 1}
+        if name == 'frame':
+            record['args'] = {'frame': frame}
+        return json.dumps(record)
+
+
+    def write_events(self):
+        """Writer thread: formats and writes batches until sent None"""
+        first = True
+        while True:
+            events = self.pending.get()
+            if events is None:
+                break
+            lines = [self.format_event(event) for event in events]
+            if not first:
+                self.trace_file.write(',\n')
+            self.trace_file.write(',\n'.join(lines))
+            first = False
+
+
+    def close(self):
+        """Writes out what is left and finishes the trace file"""
+        self.flush()
+        self.pending.put(None)
+        self.writer.join()
+        self.trace_file.write('\n]\n')
+        self.trace_file.close()
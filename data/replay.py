@@ -0,0 +1,136 @@
+__author__ = 'justinarmstrong'
+
+"""
+Records the keys and game time of every frame a Control runs, and plays
+them back.  A replay file holds one key bitmask byte and one game time per
+frame, both zlib compressed, along with a summary of how the run went so
+playback can check that it reproduced the run.
+"""
+
+import sys
+import json
+import zlib
+import struct
+from array import array
+from . import tools
+from . import constants as c
+
+
+MAGIC = b'SMBR'
+VERSION = 1
+HEADER = struct.Struct('<4sHIIII')
+
+
+class Recorder(object):
+    """Attach to Control.recorder to record every frame of a run.
+    start_state is the state the run began in, which playback has to
+    begin in too."""
+    def __init__(self, start_state):
+        self.start_state = start_state
+        self.keys = bytearray()
+        self.times = array('d')
+        self.deaths = []
+        self.mario_dead = False
+        self.control = None
+
+    def record(self, control):
+        """Called by the Control after each frame's update"""
+        self.control = control
+        self.keys.append(tools.KeyState.from_keys(control.keys).mask)
+        self.times.append(control.current_time)
+        if control.state_name == c.LEVEL1:
+            mario_dead = control.state.game_info[c.MARIO_DEAD]
+            if mario_dead and not self.mario_dead:
+                self.deaths.append(len(self.keys) - 1)
+            self.mario_dead = mario_dead
+
+
+    def get_summary(self):
+        """How the recorded run went: the state it began in, its length,
+        score, the frames Mario died on and where he was when it ended"""
+        summary = {'start state': self.start_state,
+                   'frames': len(self.keys),
+                   'deaths': self.deaths,
+                   'score': None,
+                   'mario x': None}
+        if self.control is not None:
+            summary['score'] = self.control.state.persist.get(c.SCORE)
+            level = self.control.state_dict.get(c.LEVEL1)
+            if getattr(level, 'mario', None) is not None:
+                summary['mario x'] = level.mario.rect.x
+        return summary
+
+
+    def save(self, filename):
+        """Writes the recording to a replay file"""
+        times = array('d', self.times)
+        if sys.byteorder == 'big':
+            times.byteswap()
+        keys = zlib.compress(bytes(self.keys), 9)
+        times = zlib.compress(times.tobytes(), 9)
+        summary = json.dumps(self.get_summary(), sort_keys=True).encode('utf-8')
+        with open(filename, 'wb') as replay_file:
+            replay_file.write(HEADER.pack(MAGIC, VERSION, len(self.keys),
+                                          len(keys), len(times), len(summary)))
+            replay_file.write(keys)
+            replay_file.write(times)
+            replay_file.write(summary)
+
+
+class Replay(object):
+    """A recorded run.  Use it as both the Control's game clock and its
+    input_source to play the run back frame for frame."""
+    def __init__(self, keys, times, summary):
+        self.keys = keys
+        self.times = times
+        self.summary = summary
+        self.key_states = [tools.KeyState(mask) for mask in range(256)]
+        self.frame = -1
+
+    def __len__(self):
+        return len(self.keys)
+
+    def get_start_state(self):
+        """The state the recording began in"""
+        return self.summary['start state']
+
+    def tick(self):
+        self.frame += 1
+
+    def get_ticks(self):
+        return self.times[self.frame]
+
+    def get_keys(self):
+        return self.key_states[self.keys[self.frame]]
+
+
+    @classmethod
+    def load(cls, filename):
+        """Reads a replay file written by Recorder.save"""
+        with open(filename, 'rb') as replay_file:
+            data = replay_file.read()
+        magic, version, frames, keys_size, times_size, summary_size = \
+            HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('{} is not a version {} replay file'.format(
+                filename, VERSION))
+
+        start = HEADER.size
+        keys = bytearray(zlib.decompress(data[start:start + keys_size]))
+        start += keys_size
+        times = array('d')
+        times.frombytes(zlib.decompress(data[start:start + times_size]))
+        if sys.byteorder == 'big':
+            times.byteswap()
+        start += times_size
+        summary = json.loads(data[start:start + summary_size].decode('utf-8'))
+        return cls(keys, times, summary)
+
+
+    def check(self, recorder):
+        """Compares the recorded summary with the one a Recorder made while
+        playing the replay back.  Returns the names of the fields that
+        differ."""
+        played = recorder.get_summary()
+        return [name for name in sorted(self.summary)
+                if self.summary[name] != played.get(name)]
@@ -0,0 +1,372 @@
+__author__ = 'justinarmstrong'
+
+"""
+Runs Level1Env rollouts in worker processes so that simulation is not held
+to one core by the GIL.  Each worker keeps its own headless level and plays
+whole jobs: a job is a list of actions, played from a fresh reset until it
+runs out or the episode ends.  A worker that dies takes none of the batch
+with it; it is replaced and its job is handed out again.
+
+ProcessVectorEnv instead steps one level per worker in lockstep, with the
+workers drawing straight into a shared FrameRing.
+"""
+
+import traceback
+import multiprocessing
+from multiprocessing.connection import wait
+import numpy as np
+from . import constants as c
+
+
+def get_context():
+    """Forked workers start without re-importing the game; fall back to
+    the platform's default where fork is not available"""
+    if hasattr(multiprocessing, 'get_context'):
+        try:
+            return multiprocessing.get_context('fork')
+        except ValueError:
+            return multiprocessing.get_context()
+    return multiprocessing
+
+
+def play(env, actions):
+    """Plays one job in env and returns its trajectory"""
+    env.reset()
+    rewards = []
+    infos = []
+    for action in actions:
+        rewards.append(env.advance(action))
+        infos.append(env.get_info())
+        if env.done:
+            break
+    return {'rewards': rewards,
+            'infos': infos,
+            'done': env.done}
+
+
+def run_worker(connection, frame_skip, render_mode):
+    """Worker process loop: plays jobs sent down connection until it is
+    sent None"""
+    from .environment import Level1Env
+    env = Level1Env(frame_skip, render_mode)
+    while True:
+        job = connection.recv()
+        if job is None:
+            break
+        job_id, actions = job
+        try:
+            connection.send((job_id, True, play(env, actions)))
+        except Exception:
+            connection.send((job_id, False, traceback.format_exc()))
+    connection.close()
+
+
+def run_env_worker(connection, ring, row, frame_skip, render_mode):
+    """Worker process loop for ProcessVectorEnv: resets or steps its level
+    into the ring slot it is told to until it is sent None"""
+    from .environment import Level1Env
+    env = Level1Env(frame_skip, render_mode)
+    surfaces = [ring.get_surface(slot, row) for slot in range(ring.num_slots)]
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        command, slot, action = message
+        env.surface = surfaces[slot]
+        ring.begin_write(slot, row)
+        try:
+            if command == 'reset':
+                env.reset()
+                reply = [0, False]
+            else:
+                reply = [env.advance(action), env.done]
+            reply.append(env.get_info())
+            if env.done:
+                env.reset()
+            succeeded = True
+        except Exception:
+            reply = traceback.format_exc()
+            succeeded = False
+        finally:
+            sequence = ring.end_write(slot, row)
+        if succeeded:
+            reply.append(sequence)
+        connection.send((succeeded, reply))
+    connection.close()
+
+
+class Worker(object):
+    """One worker process and the parent's end of its pipe"""
+    def __init__(self, context, target, args):
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=target,
+                                       args=(child_connection,) + args)
+        self.process.daemon = True
+        self.process.start()
+        child_connection.close()
+        self.job_id = None
+
+
+    def send(self, job_id, actions):
+        self.job_id = job_id
+        self.connection.send((job_id, actions))
+
+
+    def stop(self):
+        """Asks the worker to exit and waits for it"""
+        try:
+            self.connection.send(None)
+        except (IOError, OSError):
+            pass
+        self.process.join(1)
+        self.end_process()
+        self.connection.close()
+
+
+    def kill(self):
+        """Ends a worker that can no longer be trusted"""
+        self.end_process()
+        self.connection.close()
+        self.job_id = None
+
+
+    def end_process(self):
+        """SDL turns SIGTERM into a quit event in a process that has
+        started pygame, so the worker is sent SIGKILL where there is one"""
+        if self.process.is_alive():
+            if hasattr(self.process, 'kill'):
+                self.process.kill()
+            else:
+                self.process.terminate()
+        self.process.join()
+
+
+class RolloutPool(object):
+    """A pool of worker processes that play batches of jobs.  run() hands
+    out jobs to whichever workers are free and returns the trajectories in
+    job order.  Workers that crash are restarted and their jobs retried,
+    up to max_retries times per job."""
+    def __init__(self, num_workers=None, frame_skip=1,
+                 render_mode=c.RENDER_NONE, max_retries=3):
+        self.context = get_context()
+        self.num_workers = num_workers or multiprocessing.cpu_count()
+        self.frame_skip = frame_skip
+        self.render_mode = render_mode
+        self.max_retries = max_retries
+        self.restarts = 0
+        self.workers = [self.start_worker()
+                        for _ in range(self.num_workers)]
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+    def start_worker(self):
+        return Worker(self.context, run_worker,
+                      (self.frame_skip, self.render_mode))
+
+
+    def run(self, jobs):
+        """Plays every job (a list of ACTIONS indexes) and returns a
+        trajectory for each: its rewards, the info after every step, and
+        whether the episode ended"""
+        jobs = list(jobs)
+        results = [None] * len(jobs)
+        failures = [0] * len(jobs)
+        pending = list(range(len(jobs)))
+        pending.reverse()
+        remaining = len(jobs)
+
+        try:
+            while remaining:
+                remaining = self.collect(jobs, pending, results, failures,
+                                         remaining)
+        except BaseException:
+            self.abandon_jobs()
+            raise
+        return results
+
+
+    def collect(self, jobs, pending, results, failures, remaining):
+        """Hands pending jobs to free workers and waits for at least one
+        to finish.  Returns how many jobs are left."""
+        for worker in self.workers:
+            if worker.job_id is None and pending:
+                job_id = pending.pop()
+                try:
+                    worker.send(job_id, jobs[job_id])
+                except (IOError, OSError):
+                    pass
+
+        busy = dict((worker.connection, worker) for worker in self.workers
+                    if worker.job_id is not None)
+        sentinels = dict((worker.process.sentinel, worker)
+                         for worker in busy.values())
+        for ready in wait(list(busy) + list(sentinels)):
+            worker = busy.get(ready) or sentinels[ready]
+            if worker.job_id is None:
+                continue
+            try:
+                job_id, succeeded, result = worker.connection.recv()
+            except (EOFError, IOError, OSError):
+                job_id = worker.job_id
+                failures[job_id] += 1
+                if failures[job_id] > self.max_retries:
+                    raise RuntimeError('job {} crashed {} workers'.format(
+                        job_id, failures[job_id]))
+                pending.append(job_id)
+                self.replace_worker(worker)
+                continue
+            worker.job_id = None
+            if not succeeded:
+                raise RuntimeError('job {} failed in a worker:\n{}'.format(
+                    job_id, result))
+            results[job_id] = result
+            remaining -= 1
+        return remaining
+
+
+    def abandon_jobs(self):
+        """Restarts every worker still playing a job, so that no reply
+        from a batch that failed is taken for one of the next batch's"""
+        for i, worker in enumerate(self.workers):
+            if worker.job_id is not None:
+                worker.kill()
+                self.workers[i] = self.start_worker()
+
+
+    def replace_worker(self, worker):
+        """Swaps a dead worker for a new one"""
+        worker.kill()
+        self.workers[self.workers.index(worker)] = self.start_worker()
+        self.restarts += 1
+
+
+    def close(self):
+        """Stops every worker"""
+        for worker in self.workers:
+            worker.stop()
+        self.workers = []
+
+
+class ProcessVectorEnv(object):
+    """VectorLevel1Env with every level in its own worker process.  Only
+    actions, rewards and infos go through the pipes; each worker draws its
+    level into a FrameRing of num_slots slots, taking the next slot every
+    step, and the observations returned are a view of that slot.  A view
+    stays good for num_slots - 1 more steps; keep get_frame_id() alongside
+    it and is_current() tells whether it has been drawn over.  Dirty rect
+    rendering needs the previous frame under the new one, so it cannot be
+    used here.
+
+    When a level raises or its worker dies, reset() and step() raise too,
+    but only once every other worker has replied; a dead worker is
+    replaced.  Call reset() before stepping again."""
+    def __init__(self, num_envs, frame_skip=1, render_mode=c.RENDER_FULL,
+                 num_slots=2):
+        from .framering import FrameRing
+        if render_mode == c.RENDER_DIRTY:
+            raise ValueError('ProcessVectorEnv cannot use dirty rect rendering')
+        self.ring = FrameRing(num_slots, num_envs)
+        self.context = get_context()
+        self.frame_skip = frame_skip
+        self.render_mode = render_mode
+        self.workers = [self.start_worker(row) for row in range(num_envs)]
+        self.slot = num_slots - 1
+        self.sequences = np.zeros(num_envs, np.int64)
+        self.rewards = np.zeros(num_envs, np.float32)
+        self.dones = np.zeros(num_envs, np.bool_)
+        self.infos = [None] * num_envs
+
+
+    def __len__(self):
+        return len(self.workers)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+    def start_worker(self, row):
+        return Worker(self.context, run_env_worker,
+                      (self.ring, row, self.frame_skip, self.render_mode))
+
+
+    def replace_worker(self, row):
+        """Swaps a dead worker for a new one, ending the write it may have
+        died in the middle of"""
+        self.workers[row].kill()
+        if self.ring.sequences[self.slot, row] % 2:
+            self.ring.end_write(self.slot, row)
+        self.workers[row] = self.start_worker(row)
+
+
+    def reset(self):
+        """Starts every level over and returns the first observations"""
+        self.send('reset', [None] * len(self.workers))
+        return self.ring.get_frames(self.slot)
+
+
+    def step(self, actions):
+        """Takes actions[i] in level i.  Returns the observations,
+        rewards, dones and infos."""
+        self.send('step', actions)
+        return self.ring.get_frames(self.slot), self.rewards, self.dones, \
+            self.infos
+
+
+    def send(self, command, actions):
+        """Has every worker carry out a command into the next slot and
+        collects the replies.  Every reply is read before an error is
+        raised, so none is left in a pipe to be taken for the next one."""
+        self.slot = (self.slot + 1) % self.ring.num_slots
+        for worker, action in zip(self.workers, actions):
+            try:
+                worker.connection.send((command, self.slot, action))
+            except (IOError, OSError):
+                pass
+
+        error = None
+        for i, worker in enumerate(self.workers):
+            try:
+                succeeded, reply = worker.connection.recv()
+            except (EOFError, IOError, OSError):
+                self.replace_worker(i)
+                error = error or 'level {} worker died'.format(i)
+                continue
+            if not succeeded:
+                error = error or 'level {} failed in its worker:\n{}'.format(
+                    i, reply)
+                continue
+            self.rewards[i], self.dones[i], self.infos[i], \
+                self.sequences[i] = reply
+        if error is not None:
+            raise RuntimeError(error)
+
+
+    def get_frame_id(self):
+        """Identifies the observations last returned"""
+        return self.slot, self.sequences.copy()
+
+
+    def is_current(self, frame_id):
+        """Whether the observations a get_frame_id() result identifies
+        have not been drawn over yet"""
+        return self.ring.is_current(*frame_id)
+
+
+    def close(self):
+        """Stops the workers and frees the frame ring"""
+        for worker in self.workers:
+            worker.stop()
+        self.workers = []
+        self.ring.close()
@@ -2,27 +2,61 @@ __author__ = 'justinarmstrong'
 
 """
 This module initializes the display and creates dictionaries of resources.
+Nothing happens on import; init() must be called once before any state
+is created.
 """
 
 import os
 import pygame as pg
 from . import tools
+from . import bake
 from .import constants as c
 
 ORIGINAL_CAPTION = c.ORIGINAL_CAPTION
-
-
-os.environ['SDL_VIDEO_CENTERED'] = '1'
-pg.init()
-pg.event.set_allowed([pg.KEYDOWN, pg.KEYUP, pg.QUIT])
-pg.display.set_caption(c.ORIGINAL_CAPTION)
-SCREEN = pg.display.set_mode(c.SCREEN_SIZE)
-SCREEN_RECT = SCREEN.get_rect()
-
-
-FONTS = tools.load_all_fonts(os.path.join("resources","fonts"))
-MUSIC = tools.load_all_music(os.path.join("resources","music"))
-GFX   = tools.load_all_gfx(os.path.join("resources","graphics"))
-SFX   = tools.load_all_sfx(os.path.join("resources","sound"))
+GRAPHICS_DIRECTORY = os.path.join("resources","graphics")
+
+HEADLESS = False
+SCREEN = None
+SCREEN_RECT = None
+FONTS = {}
+MUSIC = {}
+GFX = {}
+SFX = {}
+MUSIC_PLAYER = None
+
+
+def init(headless=False):
+    """Initializes pygame and loads all resources.  In headless mode SDL
+    uses its dummy video driver, the mixer is never opened and every
+    sound is replaced with a silent stand-in.  The sprite sheets and their
+    frames come from data.bake's bake when there is an up to date one.
+    Calling this again after the first time does nothing."""
+    global HEADLESS, SCREEN, SCREEN_RECT, FONTS, MUSIC, GFX, SFX, MUSIC_PLAYER
+
+    if SCREEN is not None:
+        return
+
+    HEADLESS = headless
+    if headless:
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        os.environ['SDL_AUDIODRIVER'] = 'dummy'
+        pg.display.init()
+        MUSIC_PLAYER = tools.NullMusic()
+    else:
+        os.environ['SDL_VIDEO_CENTERED'] = '1'
+        pg.init()
+        MUSIC_PLAYER = pg.mixer.music
+
+    pg.event.set_allowed([pg.KEYDOWN, pg.KEYUP, pg.QUIT])
+    pg.display.set_caption(c.ORIGINAL_CAPTION)
+    SCREEN = pg.display.set_mode(c.SCREEN_SIZE)
+    SCREEN_RECT = SCREEN.get_rect()
+
+    FONTS = tools.load_all_fonts(os.path.join("resources","fonts"))
+    MUSIC = tools.load_all_music(os.path.join("resources","music"))
+    GFX   = bake.load(GRAPHICS_DIRECTORY) or \
+            tools.load_all_gfx(GRAPHICS_DIRECTORY)
+    SFX   = tools.load_all_sfx(os.path.join("resources","sound"),
+                              headless=headless)
 
 
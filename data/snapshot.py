@@ -0,0 +1,185 @@
+__author__ = 'justinarmstrong'
+
+"""
+Saves and restores the simulation state of a running Level1.  Image data
+is never written: frames are stored by their frame cache key, sheets by
+name, and anything the level built at startup (its groups, its sprites,
+their own surfaces and masks) is stored as a reference back into the
+level.  Any other surface or mask is an error.  Mario's fields, timers,
+floating scores and sprites created during play are pickled as they are.
+What is only there for drawing or sound is left out, and a restored
+level keeps its own.
+"""
+
+import io
+import pickle
+import pygame as pg
+from . import setup, tools
+
+
+PLAIN_TYPES = (type(None), bool, int, float, str, bytes, tuple)
+
+#Drawing, sound and bookkeeping, none of which the simulation reads
+SKIPPED_ATTRIBUTES = ('background', 'template', 'drawn',
+                      'drawn_viewport', 'dirty_rects', 'render_mode',
+                      'persist', 'game_info', 'snapshot_references',
+                      'interpolate', 'previous_positions',
+                      'previous_viewport_x', 'profiler', 'sound_manager')
+
+
+class Pickler(pickle.Pickler):
+    """Pickler that writes references for objects the level already has"""
+    def __init__(self, file, references):
+        pickle.Pickler.__init__(self, file, pickle.HIGHEST_PROTOCOL)
+        self.references = references
+
+    def persistent_id(self, obj):
+        if type(obj) in PLAIN_TYPES:
+            return None
+        reference = self.references.get(id(obj))
+        if reference is not None:
+            return reference
+        elif isinstance(obj, pg.Surface):
+            return surface_id(obj)
+        elif isinstance(obj, pg.mask.Mask):
+            raise pickle.PicklingError('a mask the level did not build at '
+                                       'startup cannot be saved')
+        return None
+
+
+class Unpickler(pickle.Unpickler):
+    """Unpickler that resolves references written by Pickler"""
+    def __init__(self, file, objects):
+        pickle.Unpickler.__init__(self, file)
+        self.objects = objects
+
+    def persistent_load(self, pid):
+        if pid[0] == 'object':
+            return self.objects[pid[1]]
+        elif pid[0] == 'frame':
+            return tools.FRAME_CACHE[pid[1]]
+        elif pid[0] == 'sheet':
+            return tools.SHEETS[pid[1]]
+        raise pickle.UnpicklingError('unknown reference {}'.format(pid[0]))
+
+
+def surface_id(surface):
+    """Names a surface by its frame cache key or its sheet's name.  A
+    surface that is neither cannot be found again, so it is an error."""
+    if surface in tools.FRAME_KEYS:
+        return 'frame', tools.FRAME_KEYS[surface]
+    elif surface in tools.SHEET_NAMES:
+        return 'sheet', tools.SHEET_NAMES[surface]
+    raise pickle.PicklingError('a {}x{} surface that is neither a cached '
+                               'frame nor a sheet cannot be saved'.format(
+                                   *surface.get_size()))
+
+
+def get_references(level):
+    """Everything a snapshot of level refers to rather than copies: its
+    game_info dict, overhead info, groups and the sprites it built at
+    startup, any surfaces or masks those sprites started out with, and the
+    loaded resources.  The order only depends on how the level was built,
+    so a snapshot can be restored into any Level1, not just the one that
+    took it."""
+    if getattr(level, 'snapshot_references', None) is None:
+        group_members, sprite_states = level.template
+        objects = [level, level.overhead_info_display,
+                   setup.GFX, setup.SFX, setup.MUSIC]
+        objects.extend(group for group, members in group_members)
+        sprites = []
+        seen = set()
+        for group, members in group_members:
+            for sprite in members:
+                if sprite not in seen:
+                    seen.add(sprite)
+                    sprites.append(sprite)
+        objects.extend(sprites)
+        for sprite in sprites:
+            for value in vars(sprite).values():
+                if isinstance(value, pg.mask.Mask) or \
+                        (isinstance(value, pg.Surface) and
+                         value not in tools.FRAME_KEYS):
+                    objects.append(value)
+        level.snapshot_references = objects
+    return [level.game_info] + level.snapshot_references
+
+
+def is_unchanged(value, recorded):
+    """Whether an attribute still holds what copy_state recorded"""
+    return value is recorded or \
+        (type(value) is type(recorded) and value == recorded)
+
+
+def get_changes(sprite, state):
+    """The attributes of a sprite that differ from a copy_state record,
+    and the names of recorded attributes it no longer has"""
+    fixed, owned = state
+    attributes = vars(sprite)
+    changed = {}
+    for name, value in attributes.items():
+        if name == '_Sprite__g':
+            continue
+        elif name in fixed:
+            if is_unchanged(value, fixed[name]):
+                continue
+        elif name in owned:
+            if is_unchanged(value, owned[name]):
+                continue
+        changed[name] = value
+    removed = [name for name in list(fixed) + list(owned)
+               if name not in attributes]
+    return changed, removed
+
+
+def dumps(level):
+    """Returns the level's current state as a string of bytes.  Sprites
+    the level built only record how they differ from when it was built."""
+    objects = get_references(level)
+    references = dict((id(obj), ('object', i)) for i, obj in enumerate(objects))
+    group_members, sprite_states = level.template
+
+    attributes = dict((name, value) for name, value in vars(level).items()
+                      if name not in SKIPPED_ATTRIBUTES)
+    overhead_info = dict((name, value) for name, value
+                         in vars(level.overhead_info_display).items()
+                         if not isinstance(value, (list, dict)))
+    data = {'level': attributes,
+            'game info': dict(level.game_info),
+            'overhead info': overhead_info,
+            'sprites': [get_changes(sprite, state)
+                        for sprite, state in sprite_states],
+            'groups': [group.sprites() for group, members in group_members]}
+    file = io.BytesIO()
+    Pickler(file, references).dump(data)
+    return file.getvalue()
+
+
+def loads(level, snapshot):
+    """Puts level back into the state recorded by dumps.  Sprites the level
+    built are updated in place; anything made during play is recreated."""
+    data = Unpickler(io.BytesIO(snapshot), get_references(level)).load()
+    group_members, sprite_states = level.template
+
+    for name, value in data['level'].items():
+        setattr(level, name, value)
+    level.game_info.clear()
+    level.game_info.update(data['game info'])
+
+    overhead_info = level.overhead_info_display
+    overhead_info.__dict__.update(data['overhead info'])
+    overhead_info.refresh_labels()
+    overhead_info.changed_rects = []
+
+    for (sprite, state), (changed, removed) in zip(sprite_states,
+                                                   data['sprites']):
+        tools.restore_state(sprite, state)
+        sprite.__dict__.update(changed)
+        for name in removed:
+            del sprite.__dict__[name]
+
+    for (group, members), snapshot_members in zip(group_members,
+                                                  data['groups']):
+        if group.sprites() != snapshot_members:
+            group.empty()
+            group.add(*snapshot_members)
@@ -5,7 +5,9 @@ import pygame as pg
 from .. import setup, tools
 from .. import constants as c
 from .. import game_sound
+from .. import snapshot
 from .. components import mario
+from .. components import background
 from .. components import collider
 from .. components import bricks
 from .. components import coin_box
@@ -18,11 +20,17 @@ from .. components import castle_flag
 
 
 class Level1(tools._State):
-    def __init__(self):
+    def __init__(self, render_mode=c.RENDER_FULL):
         tools._State.__init__(self)
+        self.render_mode = render_mode
+        self.template = None
+        self.previous_positions = {}
+        self.previous_viewport_x = 0
 
     def startup(self, current_time, persist):
-        """Called when the State object is created"""
+        """Called when the State object is created.  The level is only
+        built the first time; after that it is reset from a template of
+        its starting state."""
         self.game_info = persist
         self.persist = self.game_info
         self.game_info[c.CURRENT_TIME] = current_time
@@ -36,37 +44,49 @@ class Level1(tools._State):
         self.flag_score_total = 0
 
         self.moving_score_list = []
-        self.overhead_info_display = info.OverheadInfo(self.game_info, c.LEVEL)
+        self.drawn = None
+        self.drawn_viewport = None
+        self.dirty_rects = None
+        self.previous_positions = {}
+
+        if self.template is None:
+            self.overhead_info_display = info.OverheadInfo(self.game_info,
+                                                           c.LEVEL)
+            self.setup_background()
+            self.setup_ground()
+            self.setup_pipes()
+            self.setup_steps()
+            self.setup_bricks()
+            self.setup_coin_boxes()
+            self.setup_flag_pole()
+            self.setup_enemies()
+            self.setup_mario()
+            self.setup_checkpoints()
+            self.setup_spritegroups()
+            self.template = self.create_template()
+        else:
+            self.overhead_info_display.reset(self.game_info, c.LEVEL)
+            self.reset_from_template()
+            self.setup_viewport()
+            self.place_mario()
         self.sound_manager = game_sound.Sound(self.overhead_info_display)
 
-        self.setup_background()
-        self.setup_ground()
-        self.setup_pipes()
-        self.setup_steps()
-        self.setup_bricks()
-        self.setup_coin_boxes()
-        self.setup_flag_pole()
-        self.setup_enemies()
-        self.setup_mario()
-        self.setup_checkpoints()
-        self.setup_spritegroups()
-
 
     def setup_background(self):
-        """Sets the background image, rect and scales it to the correct
-        proportions"""
-        self.background = setup.GFX['level_1']
-        self.back_rect = self.background.get_rect()
-        self.background = pg.transform.scale(self.background,
-                                  (int(self.back_rect.width*c.BACKGROUND_MULTIPLER),
-                                  int(self.back_rect.height*c.BACKGROUND_MULTIPLER)))
-        self.back_rect = self.background.get_rect()
-        width = self.back_rect.width
-        height = self.back_rect.height
-
-        self.level = pg.Surface((width, height)).convert()
-        self.level_rect = self.level.get_rect()
-        self.viewport = setup.SCREEN.get_rect(bottom=self.level_rect.bottom)
+        """Sets up the background, which is scaled to the correct
+        proportions a screen-sized chunk at a time as the camera reaches it"""
+        self.background = background.ChunkedBackground(setup.GFX['level_1'],
+                                                       c.BACKGROUND_MULTIPLER)
+        self.back_rect = self.background.rect
+        self.level_rect = self.back_rect.copy()
+        self.setup_viewport()
+
+
+    def setup_viewport(self):
+        """Puts the camera where the level starts, or at the last
+        checkpoint Mario reached"""
+        self.viewport = pg.Rect((0, 0), c.SCREEN_SIZE)
+        self.viewport.bottom = self.level_rect.bottom
         self.viewport.x = self.game_info[c.CAMERA_START_X]
 
 
@@ -190,22 +210,23 @@ class Level1(tools._State):
         brick30 = bricks.Brick(7245, 365)
         brick31 = bricks.Brick(7331, 365)
 
-        self.brick_group = pg.sprite.Group(brick1,  brick2,
-                                           brick3,  brick4,
-                                           brick5,  brick6,
-                                           brick7,  brick8,
-                                           brick9,  brick10,
-                                           brick11, brick12,
-                                           brick13, brick14,
-                                           brick15, brick16,
-                                           brick17, brick18,
-                                           brick19, brick20,
-                                           brick21, brick22,
-                                           brick23, brick24,
-                                           brick25, brick26,
-                                           brick27, brick28,
-                                           brick29, brick30,
-                                           brick31)
+        self.brick_group = collider.ColliderGroup(brick1,  brick2,
+                                                  brick3,  brick4,
+                                                  brick5,  brick6,
+                                                  brick7,  brick8,
+                                                  brick9,  brick10,
+                                                  brick11, brick12,
+                                                  brick13, brick14,
+                                                  brick15, brick16,
+                                                  brick17, brick18,
+                                                  brick19, brick20,
+                                                  brick21, brick22,
+                                                  brick23, brick24,
+                                                  brick25, brick26,
+                                                  brick27, brick28,
+                                                  brick29, brick30,
+                                                  brick31,
+                                                  padding=c.BUMP_PADDING)
 
 
     def setup_coin_boxes(self):
@@ -223,12 +244,13 @@ class Level1(tools._State):
         coin_box11 = coin_box.Coin_box(5531, 193, c.COIN, self.coin_group)
         coin_box12 = coin_box.Coin_box(7288, 365, c.COIN, self.coin_group)
 
-        self.coin_box_group = pg.sprite.Group(coin_box1,  coin_box2,
-                                              coin_box3,  coin_box4,
-                                              coin_box5,  coin_box6,
-                                              coin_box7,  coin_box8,
-                                              coin_box9,  coin_box10,
-                                              coin_box11, coin_box12)
+        self.coin_box_group = collider.ColliderGroup(coin_box1,  coin_box2,
+                                                     coin_box3,  coin_box4,
+                                                     coin_box5,  coin_box6,
+                                                     coin_box7,  coin_box8,
+                                                     coin_box9,  coin_box10,
+                                                     coin_box11, coin_box12,
+                                                     padding=c.BUMP_PADDING)
 
 
     def setup_flag_pole(self):
@@ -309,6 +331,11 @@ class Level1(tools._State):
     def setup_mario(self):
         """Places Mario at the beginning of the level"""
         self.mario = mario.Mario()
+        self.place_mario()
+
+
+    def place_mario(self):
+        """Puts Mario on the ground at the left of the camera"""
         self.mario.rect.x = self.viewport.x + 110
         self.mario.rect.bottom = c.GROUND_HEIGHT
 
@@ -343,21 +370,109 @@ class Level1(tools._State):
         self.shell_group = pg.sprite.Group()
         self.enemy_group = pg.sprite.Group()
 
-        self.ground_step_pipe_group = pg.sprite.Group(self.ground_group,
-                                                      self.pipe_group,
-                                                      self.step_group)
+        self.ground_step_pipe_group = collider.ColliderGroup(self.ground_group,
+                                                             self.pipe_group,
+                                                             self.step_group)
 
         self.mario_and_enemy_group = pg.sprite.Group(self.mario,
                                                      self.enemy_group)
 
 
+    def get_sprite_groups(self):
+        """Every sprite group the level owns, including the enemy groups
+        waiting on their checkpoints"""
+        groups = [value for value in vars(self).values()
+                  if isinstance(value, pg.sprite.AbstractGroup)]
+        return groups + self.enemy_group_list
+
+
+    def create_template(self):
+        """Records each group's members and every sprite's attributes right
+        after the level is built, for reset_from_template.  Colliders are
+        static geometry and are left out."""
+        group_members = []
+        sprite_states = []
+        seen = set()
+        for group in self.get_sprite_groups():
+            group_members.append((group, group.sprites()))
+            for sprite in group_members[-1][1]:
+                if sprite not in seen and \
+                        not isinstance(sprite, collider.Collider):
+                    seen.add(sprite)
+                    sprite_states.append((sprite, tools.copy_state(sprite)))
+        return group_members, sprite_states
+
+
+    def reset_from_template(self):
+        """Puts every sprite and group back the way they were when the level
+        was first built.  Sprites made during play are dropped with their
+        groups.  Groups nothing was added to or removed from, such as the
+        static ground, pipes and steps, keep their members and collision
+        grids untouched."""
+        group_members, sprite_states = self.template
+        changed = [(group, members) for group, members in group_members
+                   if group.sprites() != members]
+        for group, members in changed:
+            group.empty()
+        for sprite, state in sprite_states:
+            tools.restore_state(sprite, state)
+        for group, members in changed:
+            group.add(*members)
+
+
+    def snapshot(self):
+        """Returns the complete state of the level, without image data, as
+        bytes that restore accepts"""
+        return snapshot.dumps(self)
+
+
+    def restore(self, data):
+        """Puts the level back into a state returned by snapshot"""
+        snapshot.loads(self, data)
+        self.drawn = None
+        self.previous_positions = {}
+
+
     def update(self, surface, keys, current_time):
         """Updates Entire level using states.  Called by the control object"""
+        self.simulate(keys, current_time)
+        self.render(surface)
+
+
+    def simulate(self, keys, current_time):
+        """Advances the level, and its sound, by one frame without drawing
+        anything"""
+        if self.interpolate:
+            self.record_positions()
         self.game_info[c.CURRENT_TIME] = self.current_time = current_time
+        self.profiler.start('handle_states')
         self.handle_states(keys)
+        self.profiler.stop('handle_states')
+        if self.profiler.counting:
+            self.profiler.count('entities',
+                                {'enemies': len(self.enemy_group),
+                                 'powerups': len(self.powerup_group),
+                                 'scores': len(self.moving_score_list)})
         self.check_if_time_out()
-        self.blit_everything(surface)
+        self.profiler.start('sound_manager.update')
         self.sound_manager.update(self.game_info, self.mario)
+        self.profiler.stop('sound_manager.update')
+
+
+    def render(self, surface, alpha=1.0):
+        """Draws the level.  alpha is how far between the last two
+        simulated frames to draw it."""
+        self.profiler.start('blit_everything')
+        self.blit_everything(surface, alpha)
+        self.profiler.stop('blit_everything')
+
+
+    def record_positions(self):
+        """Remembers where everything is before a frame is simulated, so
+        that frame can be drawn interpolated"""
+        self.previous_viewport_x = self.viewport.x
+        self.previous_positions = dict((sprite, sprite.rect.topleft)
+                                       for sprite in self.get_level_sprites())
 
 
 
@@ -377,7 +492,9 @@ class Level1(tools._State):
         """Updates mario in a transition state (like becoming big, small,
          or dies). Checks if he leaves the transition state or dies to
          change the level state back"""
+        self.profiler.start('mario.update')
         self.mario.update(keys, self.game_info, self.powerup_group)
+        self.profiler.stop('mario.update')
         for score in self.moving_score_list:
             score.update(self.moving_score_list, self.game_info)
         if self.flag_score:
@@ -403,14 +520,22 @@ class Level1(tools._State):
 
     def update_all_sprites(self, keys):
         """Updates the location of all sprites on the screen."""
+        profiler = self.profiler
+        profiler.start('mario.update')
         self.mario.update(keys, self.game_info, self.powerup_group)
+        profiler.stop('mario.update')
         for score in self.moving_score_list:
             score.update(self.moving_score_list, self.game_info)
         if self.flag_score:
             self.flag_score.update(None, self.game_info)
             self.check_to_add_flag_score()
+        profiler.start('group updates')
         self.flag_pole_group.update()
+        profiler.stop('group updates')
+        profiler.start('check_points_check')
         self.check_points_check()
+        profiler.stop('check_points_check')
+        profiler.start('group updates')
         self.enemy_group.update(self.game_info)
         self.sprites_about_to_die_group.update(self.game_info, self.viewport)
         self.shell_group.update(self.game_info)
@@ -419,7 +544,10 @@ class Level1(tools._State):
         self.powerup_group.update(self.game_info, self.viewport)
         self.coin_group.update(self.game_info, self.viewport)
         self.brick_pieces_group.update()
+        profiler.stop('group updates')
+        profiler.start('adjust_sprite_positions')
         self.adjust_sprite_positions()
+        profiler.stop('adjust_sprite_positions')
         self.check_if_mario_in_transition_state()
         self.check_for_mario_death()
         self.update_viewport()
@@ -521,9 +649,9 @@ class Level1(tools._State):
 
     def check_mario_x_collisions(self):
         """Check for collisions after Mario is moved on the x axis"""
-        collider = pg.sprite.spritecollideany(self.mario, self.ground_step_pipe_group)
-        coin_box = pg.sprite.spritecollideany(self.mario, self.coin_box_group)
-        brick = pg.sprite.spritecollideany(self.mario, self.brick_group)
+        collider = self.ground_step_pipe_group.collideany(self.mario)
+        coin_box = self.coin_box_group.collideany(self.mario)
+        brick = self.brick_group.collideany(self.mario)
         enemy = pg.sprite.spritecollideany(self.mario, self.enemy_group)
         shell = pg.sprite.spritecollideany(self.mario, self.shell_group)
         powerup = pg.sprite.spritecollideany(self.mario, self.powerup_group)
@@ -682,11 +810,11 @@ class Level1(tools._State):
 
     def check_mario_y_collisions(self):
         """Checks for collisions when Mario moves along the y-axis"""
-        ground_step_or_pipe = pg.sprite.spritecollideany(self.mario, self.ground_step_pipe_group)
+        ground_step_or_pipe = self.ground_step_pipe_group.collideany(self.mario)
         enemy = pg.sprite.spritecollideany(self.mario, self.enemy_group)
         shell = pg.sprite.spritecollideany(self.mario, self.shell_group)
-        brick = pg.sprite.spritecollideany(self.mario, self.brick_group)
-        coin_box = pg.sprite.spritecollideany(self.mario, self.coin_box_group)
+        brick = self.brick_group.collideany(self.mario)
+        coin_box = self.coin_box_group.collideany(self.mario)
         powerup = pg.sprite.spritecollideany(self.mario, self.powerup_group)
 
         brick, coin_box = self.prevent_collision_conflict(brick, coin_box)
@@ -847,12 +975,8 @@ class Level1(tools._State):
         """Changes Mario to a FALL state if more than a pixel above a pipe,
         ground, step or box"""
         self.mario.rect.y += 1
-        test_collide_group = pg.sprite.Group(self.ground_step_pipe_group,
-                                                 self.brick_group,
-                                                 self.coin_box_group)
 
-
-        if pg.sprite.spritecollideany(self.mario, test_collide_group) is None:
+        if self.collide_with_level(self.mario) is None:
             if self.mario.state != c.JUMP \
                 and self.mario.state != c.DEATH_JUMP \
                 and self.mario.state != c.SMALL_TO_BIG \
@@ -927,7 +1051,7 @@ class Level1(tools._State):
         in order to check against all other enemies then adds it back."""
         enemy.kill()
 
-        collider = pg.sprite.spritecollideany(enemy, self.ground_step_pipe_group)
+        collider = self.ground_step_pipe_group.collideany(enemy)
         enemy_collider = pg.sprite.spritecollideany(enemy, self.enemy_group)
 
         if collider:
@@ -961,9 +1085,9 @@ class Level1(tools._State):
 
     def check_enemy_y_collisions(self, enemy):
         """Enemy collisions on the y axis"""
-        collider = pg.sprite.spritecollideany(enemy, self.ground_step_pipe_group)
-        brick = pg.sprite.spritecollideany(enemy, self.brick_group)
-        coin_box = pg.sprite.spritecollideany(enemy, self.coin_box_group)
+        collider = self.ground_step_pipe_group.collideany(enemy)
+        brick = self.brick_group.collideany(enemy)
+        coin_box = self.coin_box_group.collideany(enemy)
 
         if collider:
             if enemy.rect.bottom > collider.rect.bottom:
@@ -1019,10 +1143,7 @@ class Level1(tools._State):
 
         else:
             enemy.rect.y += 1
-            test_group = pg.sprite.Group(self.ground_step_pipe_group,
-                                         self.coin_box_group,
-                                         self.brick_group)
-            if pg.sprite.spritecollideany(enemy, test_group) is None:
+            if self.collide_with_level(enemy) is None:
                 if enemy.state != c.JUMP:
                     enemy.state = c.FALL
 
@@ -1043,7 +1164,7 @@ class Level1(tools._State):
 
     def check_shell_x_collisions(self, shell):
         """Shell collisions along the x axis"""
-        collider = pg.sprite.spritecollideany(shell, self.ground_step_pipe_group)
+        collider = self.ground_step_pipe_group.collideany(shell)
         enemy = pg.sprite.spritecollideany(shell, self.enemy_group)
 
         if collider:
@@ -1068,7 +1189,7 @@ class Level1(tools._State):
 
     def check_shell_y_collisions(self, shell):
         """Shell collisions along the y axis"""
-        collider = pg.sprite.spritecollideany(shell, self.ground_step_pipe_group)
+        collider = self.ground_step_pipe_group.collideany(shell)
 
         if collider:
             shell.y_vel = 0
@@ -1077,7 +1198,7 @@ class Level1(tools._State):
 
         else:
             shell.rect.y += 1
-            if pg.sprite.spritecollideany(shell, self.ground_step_pipe_group) is None:
+            if self.ground_step_pipe_group.collideany(shell) is None:
                 shell.state = c.FALL
             shell.rect.y -= 1
 
@@ -1108,9 +1229,9 @@ class Level1(tools._State):
 
     def check_mushroom_x_collisions(self, mushroom):
         """Mushroom collisions along the x axis"""
-        collider = pg.sprite.spritecollideany(mushroom, self.ground_step_pipe_group)
-        brick = pg.sprite.spritecollideany(mushroom, self.brick_group)
-        coin_box = pg.sprite.spritecollideany(mushroom, self.coin_box_group)
+        collider = self.ground_step_pipe_group.collideany(mushroom)
+        brick = self.brick_group.collideany(mushroom)
+        coin_box = self.coin_box_group.collideany(mushroom)
 
         if collider:
             self.adjust_mushroom_for_collision_x(mushroom, collider)
@@ -1124,9 +1245,9 @@ class Level1(tools._State):
 
     def check_mushroom_y_collisions(self, mushroom):
         """Mushroom collisions along the y axis"""
-        collider = pg.sprite.spritecollideany(mushroom, self.ground_step_pipe_group)
-        brick = pg.sprite.spritecollideany(mushroom, self.brick_group)
-        coin_box = pg.sprite.spritecollideany(mushroom, self.coin_box_group)
+        collider = self.ground_step_pipe_group.collideany(mushroom)
+        brick = self.brick_group.collideany(mushroom)
+        coin_box = self.coin_box_group.collideany(mushroom)
 
         if collider:
             self.adjust_mushroom_for_collision_y(mushroom, collider)
@@ -1170,9 +1291,9 @@ class Level1(tools._State):
 
     def check_star_y_collisions(self, star):
         """Invincible star collisions along y axis"""
-        collider = pg.sprite.spritecollideany(star, self.ground_step_pipe_group)
-        brick = pg.sprite.spritecollideany(star, self.brick_group)
-        coin_box = pg.sprite.spritecollideany(star, self.coin_box_group)
+        collider = self.ground_step_pipe_group.collideany(star)
+        brick = self.brick_group.collideany(star)
+        coin_box = self.coin_box_group.collideany(star)
 
         if collider:
             self.adjust_star_for_collision_y(star, collider)
@@ -1223,13 +1344,7 @@ class Level1(tools._State):
 
     def check_fireball_x_collisions(self, fireball):
         """Fireball collisions along x axis"""
-        collide_group = pg.sprite.Group(self.ground_group,
-                                        self.pipe_group,
-                                        self.step_group,
-                                        self.coin_box_group,
-                                        self.brick_group)
-
-        collider = pg.sprite.spritecollideany(fireball, collide_group)
+        collider = self.collide_with_level(fireball)
 
         if collider:
             fireball.kill()
@@ -1240,13 +1355,7 @@ class Level1(tools._State):
 
     def check_fireball_y_collisions(self, fireball):
         """Fireball collisions along y axis"""
-        collide_group = pg.sprite.Group(self.ground_group,
-                                        self.pipe_group,
-                                        self.step_group,
-                                        self.coin_box_group,
-                                        self.brick_group)
-
-        collider = pg.sprite.spritecollideany(fireball, collide_group)
+        collider = self.collide_with_level(fireball)
         enemy = pg.sprite.spritecollideany(fireball, self.enemy_group)
         shell = pg.sprite.spritecollideany(fireball, self.shell_group)
 
@@ -1275,11 +1384,19 @@ class Level1(tools._State):
         fireball.explode_transition()
 
 
+    def collide_with_level(self, sprite):
+        """Returns the first ground, pipe, step, coin box or brick the
+        sprite overlaps, or None"""
+        return (self.ground_step_pipe_group.collideany(sprite)
+                or self.coin_box_group.collideany(sprite)
+                or self.brick_group.collideany(sprite))
+
+
     def check_if_falling(self, sprite, sprite_group):
         """Checks if sprite should enter a falling state"""
         sprite.rect.y += 1
 
-        if pg.sprite.spritecollideany(sprite, sprite_group) is None:
+        if sprite_group.collideany(sprite) is None:
             if sprite.state != c.JUMP:
                 sprite.state = c.FALL
 
@@ -1410,25 +1527,135 @@ class Level1(tools._State):
             self.done = True
 
 
-    def blit_everything(self, surface):
-        """Blit all sprites to the main surface"""
-        self.level.blit(self.background, self.viewport, self.viewport)
-        if self.flag_score:
-            self.flag_score.draw(self.level)
-        self.powerup_group.draw(self.level)
-        self.coin_group.draw(self.level)
-        self.brick_group.draw(self.level)
-        self.coin_box_group.draw(self.level)
-        self.sprites_about_to_die_group.draw(self.level)
-        self.shell_group.draw(self.level)
-        #self.check_point_group.draw(self.level)
-        self.brick_pieces_group.draw(self.level)
-        self.flag_pole_group.draw(self.level)
-        self.mario_and_enemy_group.draw(self.level)
-
-        surface.blit(self.level, (0,0), self.viewport)
-        self.overhead_info_display.draw(surface)
+    def blit_everything(self, surface, alpha=1.0):
+        """Blit all sprites to the main surface.  Only full redraws are
+        interpolated; the other modes always draw the last frame."""
+        if self.render_mode == c.RENDER_DIRTY:
+            self.blit_dirty(surface)
+            return
+        elif self.render_mode == c.RENDER_NONE:
+            self.overhead_info_display.changed_rects = []
+            return
+        elif alpha < 1 and self.previous_positions:
+            self.blit_interpolated(surface, alpha)
+            return
+
+        offset_x, offset_y = self.viewport.topleft
+        self.background.draw(surface, (0,0), self.viewport)
+        for sprite in self.get_level_sprites():
+            surface.blit(sprite.image, (sprite.rect.x - offset_x,
+                                        sprite.rect.y - offset_y))
+
+        self.overhead_info_display.changed_rects = []
+        self.draw_overhead_info(surface)
+        for score in self.moving_score_list:
+            score.draw(surface)
+
+
+    def blit_interpolated(self, surface, alpha):
+        """Full redraw with the camera and every sprite alpha of the way
+        from where they were before the last frame to where they are now.
+        Sprites that did not exist before it are drawn where they are."""
+        previous_x = self.previous_viewport_x
+        viewport = self.viewport.copy()
+        viewport.x = int(round(previous_x + (viewport.x - previous_x)*alpha))
+        offset_x, offset_y = viewport.topleft
+        self.background.draw(surface, (0,0), viewport)
+        previous = self.previous_positions
+        for sprite in self.get_level_sprites():
+            x, y = sprite.rect.topleft
+            last_x, last_y = previous.get(sprite, (x, y))
+            surface.blit(sprite.image,
+                         (int(round(last_x + (x - last_x)*alpha)) - offset_x,
+                          int(round(last_y + (y - last_y)*alpha)) - offset_y))
+
+        self.overhead_info_display.changed_rects = []
+        self.draw_overhead_info(surface)
         for score in self.moving_score_list:
             score.draw(surface)
 
 
+    def draw_overhead_info(self, surface):
+        """Draws the overhead info on top of the level"""
+        self.profiler.start('OverheadInfo.draw')
+        self.overhead_info_display.draw(surface)
+        self.profiler.stop('OverheadInfo.draw')
+
+
+    def get_level_sprites(self):
+        """Every sprite drawn in level coordinates, back to front, in the
+        same order blit_everything draws them"""
+        sprites = []
+        if self.flag_score:
+            sprites.extend(self.flag_score.digit_list)
+        for group in (self.powerup_group, self.coin_group, self.brick_group,
+                      self.coin_box_group, self.sprites_about_to_die_group,
+                      self.shell_group, self.brick_pieces_group,
+                      self.flag_pole_group, self.mario_and_enemy_group):
+            sprites.extend(group.sprites())
+        return sprites
+
+
+    def get_screen_sprites(self):
+        """Sprites drawn in screen coordinates on top of the overhead info"""
+        sprites = [self.overhead_info_display.flashing_coin]
+        for score in self.moving_score_list:
+            sprites.extend(score.digit_list)
+        return sprites
+
+
+    def blit_dirty(self, surface):
+        """Only repaints the parts of the screen that changed since the last
+        frame.  Every drawn sprite's image, alpha and screen position is
+        remembered, and anything that differs this frame marks both its old
+        and new rects dirty.  The whole screen is redrawn whenever the
+        camera moves, since every pixel shifts anyway."""
+        offset_x, offset_y = self.viewport.topleft
+        level_sprites = []
+        for sprite in self.get_level_sprites():
+            rect = sprite.image.get_rect(x=sprite.rect.x - offset_x,
+                                         y=sprite.rect.y - offset_y)
+            level_sprites.append((sprite, rect))
+        screen_sprites = [(sprite, sprite.image.get_rect(topleft=sprite.rect.topleft))
+                          for sprite in self.get_screen_sprites()]
+
+        drawn = {}
+        dirty = self.overhead_info_display.changed_rects
+        self.overhead_info_display.changed_rects = []
+        previous = self.drawn or {}
+        for sprite, rect in level_sprites + screen_sprites:
+            drawn[sprite] = (sprite.image, sprite.image.get_alpha(), rect)
+            before = previous.pop(sprite, None)
+            if before != drawn[sprite]:
+                dirty.append(rect)
+                if before:
+                    dirty.append(before[2])
+        dirty.extend(before[2] for before in previous.values())
+
+        full_redraw = (self.drawn is None or
+                       self.drawn_viewport != self.viewport.topleft)
+        self.drawn = drawn
+        self.drawn_viewport = self.viewport.topleft
+
+        if full_redraw:
+            self.background.draw(surface, (0,0), self.viewport)
+            for sprite, rect in level_sprites:
+                surface.blit(sprite.image, rect)
+            self.dirty_rects = None
+        else:
+            screen_rect = surface.get_rect()
+            dirty = [rect.clip(screen_rect) for rect in dirty]
+            dirty = tools.merge_rects([rect for rect in dirty if rect])
+            for rect in dirty:
+                surface.set_clip(rect)
+                self.background.draw(surface, rect,
+                                     rect.move(offset_x, offset_y))
+                for sprite, sprite_rect in level_sprites:
+                    if sprite_rect.colliderect(rect):
+                        surface.blit(sprite.image, sprite_rect)
+            surface.set_clip(None)
+            self.dirty_rects = dirty
+
+        self.draw_overhead_info(surface)
+        for score in self.moving_score_list:
+            score.draw(surface)
@@ -2,6 +2,7 @@ __author__ = 'justinarmstrong'
 
 import os
 import pygame as pg
+from .profiler import NullProfiler
 
 keybinding = {
     'action':pg.K_s,
@@ -11,19 +12,59 @@ keybinding = {
     'down':pg.K_DOWN
 }
 
+#Every key any state reads, in the order KeyState packs them
+RECORDED_KEYS = (keybinding['action'],
+                 keybinding['jump'],
+                 keybinding['left'],
+                 keybinding['right'],
+                 keybinding['down'],
+                 pg.K_UP,
+                 pg.K_RETURN)
+
 class Control(object):
     """Control class for entire project. Contains the game loop, and contains
     the event_loop which passes events to States as needed. Logic for flipping
-    states is also found here."""
-    def __init__(self, caption):
+    states is also found here.  A headless Control never presents frames
+    and never waits on the clock, so it runs as fast as the CPU allows.
+    The game clock decides what current_time each frame sees; headless
+    runs default to a FixedStepClock so they play out exactly as they
+    would at 60 FPS.  Only the current state's dirty_rects are pushed to
+    the display each frame, where None means the whole screen.  An
+    input_source replaces the keyboard, and a recorder sees every frame
+    once the state has updated.
+
+    With fixed_timestep the game is simulated at exactly fps steps per
+    second of real time, however often the screen can be drawn.  Each
+    pass of the loop runs as many steps as the elapsed time calls for and
+    then draws once, alpha of the way between the last two steps.  A slow
+    machine draws less often rather than slowing the game down, up to
+    max_frame_time ms of catching up per pass.  A fast one draws at most
+    max_render_fps times a second and sleeps in between.
+
+    A FrameProfiler set as profiler before setup_states is shared with
+    every state and times each phase of every frame."""
+    def __init__(self, caption, headless=False, max_frames=None,
+                 game_clock=None):
         self.screen = pg.display.get_surface()
         self.done = False
         self.clock = pg.time.Clock()
         self.caption = caption
         self.fps = 60
         self.show_fps = False
+        self.headless = headless
+        self.max_frames = max_frames
+        self.frame_count = 0
+        if game_clock is None:
+            game_clock = FixedStepClock(self.fps) if headless else WallClock()
+        self.game_clock = game_clock
         self.current_time = 0.0
         self.keys = pg.key.get_pressed()
+        self.input_source = None
+        self.recorder = None
+        self.fixed_timestep = False
+        self.max_frame_time = 250
+        self.max_render_fps = 240
+        self.profiler = NullProfiler()
         self.state_dict = {}
         self.state_name = None
         self.state = None
@@ -32,14 +73,25 @@ class Control(object):
         self.state_dict = state_dict
         self.state_name = start_state
         self.state = self.state_dict[self.state_name]
-
-    def update(self):
-        self.current_time = pg.time.get_ticks()
+        for state in self.state_dict.values():
+            state.interpolate = self.fixed_timestep and not self.headless
+            state.profiler = self.profiler
+
+    def update(self, render=True):
+        self.game_clock.tick()
+        self.current_time = self.game_clock.get_ticks()
+        if self.input_source is not None:
+            self.keys = self.input_source.get_keys()
         if self.state.quit:
             self.done = True
         elif self.state.done:
             self.flip_state()
-        self.state.update(self.screen, self.keys, self.current_time)
+        if render:
+            self.state.update(self.screen, self.keys, self.current_time)
+        else:
+            self.state.simulate(self.keys, self.current_time)
+        if self.recorder is not None:
+            self.recorder.record(self)
 
     def flip_state(self):
         previous, self.state_name = self.state_name, self.state.next
@@ -70,17 +122,114 @@ class Control(object):
 
     def main(self):
         """Main loop for entire program"""
+        if self.fixed_timestep and not self.headless:
+            self.main_fixed_timestep()
+            return
+        profiler = self.profiler
         while not self.done:
+            profiler.start('frame')
+            profiler.start('event_loop')
             self.event_loop()
+            profiler.stop('event_loop')
             self.update()
-            pg.display.update()
-            self.clock.tick(self.fps)
+            if not self.headless:
+                profiler.start('display.update')
+                pg.display.update(self.state.dirty_rects)
+                profiler.stop('display.update')
+                profiler.stop('frame')
+                self.clock.tick(self.fps)
+                if self.show_fps:
+                    fps = self.clock.get_fps()
+                    with_fps = "{} - {:.2f} FPS".format(self.caption, fps)
+                    pg.display.set_caption(with_fps)
+            else:
+                profiler.stop('frame')
+            profiler.end_frame()
+            self.frame_count += 1
+            if self.max_frames and self.frame_count >= self.max_frames:
+                self.done = True
+
+
+    def main_fixed_timestep(self):
+        """Main loop that steps the game at a fixed rate and draws as
+        often as it can in between"""
+        step = 1000.0 / self.fps
+        accumulator = 0.0
+        last_time = pg.time.get_ticks()
+        profiler = self.profiler
+        while not self.done:
+            profiler.start('frame')
+            profiler.start('event_loop')
+            self.event_loop()
+            profiler.stop('event_loop')
+            now = pg.time.get_ticks()
+            accumulator += min(now - last_time, self.max_frame_time)
+            last_time = now
+
+            while accumulator >= step and not self.done:
+                self.update(False)
+                accumulator -= step
+                self.frame_count += 1
+                if self.max_frames and self.frame_count >= self.max_frames:
+                    self.done = True
+
+            self.state.render(self.screen, accumulator / step)
+            profiler.start('display.update')
+            pg.display.update(self.state.dirty_rects)
+            profiler.stop('display.update')
+            profiler.stop('frame')
+            profiler.end_frame()
+            self.clock.tick(self.max_render_fps)
             if self.show_fps:
                 fps = self.clock.get_fps()
                 with_fps = "{} - {:.2f} FPS".format(self.caption, fps)
                 pg.display.set_caption(with_fps)
 
 
+class WallClock(object):
+    """Game time read straight from pygame's millisecond timer"""
+    def tick(self):
+        pass
+
+    def get_ticks(self):
+        return pg.time.get_ticks()
+
+
+class FixedStepClock(object):
+    """Simulated game time that advances exactly 1000/fps milliseconds
+    every tick, no matter how quickly frames are actually produced"""
+    def __init__(self, fps=60):
+        self.fps = fps
+        self.frame = 0
+
+    def tick(self):
+        self.frame += 1
+
+    def get_ticks(self):
+        return self.frame * 1000.0 / self.fps
+
+
+class KeyState(object):
+    """Stands in for pg.key.get_pressed(), holding just the RECORDED_KEYS
+    as a bitmask"""
+    bits = dict((key, 1 << i) for i, key in enumerate(RECORDED_KEYS))
+
+    def __init__(self, mask=0):
+        self.mask = mask
+
+    def __getitem__(self, key):
+        return bool(self.mask & self.bits.get(key, 0))
+
+    @classmethod
+    def from_keys(cls, keys):
+        """Packs anything indexable by key constant into a KeyState"""
+        mask = 0
+        for key, bit in cls.bits.items():
+            if keys[key]:
+                mask |= bit
+        return cls(mask)
+
+
 class _State(object):
     def __init__(self):
         self.start_time = 0.0
@@ -90,6 +239,9 @@ class _State(object):
         self.next = None
         self.previous = None
         self.persist = {}
+        self.dirty_rects = None
+        self.interpolate = False
+        self.profiler = NullProfiler()
 
     def get_event(self, event):
         pass
@@ -105,9 +257,133 @@ class _State(object):
     def update(self, surface, keys, current_time):
         pass
 
+    def simulate(self, keys, current_time):
+        """One step of the state without drawing it.  States that only
+        have update draw to the screen here as they always have."""
+        self.update(pg.display.get_surface(), keys, current_time)
+
+    def render(self, surface, alpha=1.0):
+        """Draws the state alpha of the way between its last two steps.
+        States that draw in update have drawn already."""
+        pass
 
 
-def load_all_gfx(directory, colorkey=(255,0,255), accept=('.png', 'jpg', 'bmp')):
+def copy_state(obj):
+    """Records an object's attributes so restore_state can put them back.
+    Rects, lists and dicts are copied, here and again on every restore, so
+    the record never shares them with the live object.  Sprite group
+    membership is left out; that belongs to the groups."""
+    fixed = {}
+    owned = {}
+    for name, value in vars(obj).items():
+        if name == '_Sprite__g':
+            continue
+        elif isinstance(value, (pg.Rect, list, dict)):
+            owned[name] = value.copy()
+        else:
+            fixed[name] = value
+    return fixed, owned
+
+
+def restore_state(obj, state):
+    """Puts back attributes recorded by copy_state, dropping any that were
+    added since.  Sprite group membership is kept as it is."""
+    fixed, owned = state
+    attributes = obj.__dict__
+    groups = attributes.get('_Sprite__g')
+    attributes.clear()
+    attributes.update(fixed)
+    for name, value in owned.items():
+        attributes[name] = value.copy()
+    if groups is not None:
+        attributes['_Sprite__g'] = groups
+
+
+def merge_rects(rects):
+    """Merges overlapping rects into their unions until none of the
+    returned rects overlap each other"""
+    merged = []
+    for rect in rects:
+        rect = pg.Rect(rect)
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
+
+FRAME_CACHE = {}
+FRAME_KEYS = {}
+SHEET_NAMES = {}
+SHEETS = {}
+
+
+def get_image(sprite_sheet, x, y, width, height, colorkey, scale):
+    """Cuts a frame out of a sprite sheet and scales it.  Frames are kept
+    in one cache for the whole process, keyed by sheet, source rect,
+    colorkey and scale, so every sprite asking for the same frame gets the
+    same Surface.  Callers must treat the result as read-only."""
+    key = (SHEET_NAMES.get(sprite_sheet, sprite_sheet),
+           x, y, width, height, colorkey, scale)
+    image = FRAME_CACHE.get(key)
+    if image is None:
+        image = pg.Surface([width, height]).convert()
+        rect = image.get_rect()
+
+        image.blit(sprite_sheet, (0, 0), (x, y, width, height))
+        image.set_colorkey(colorkey)
+        image = pg.transform.scale(image,
+                                   (int(rect.width*scale),
+                                    int(rect.height*scale)))
+        FRAME_CACHE[key] = image
+        FRAME_KEYS[image] = key
+    return image
+
+
+def flip_image(image, xbool, ybool):
+    """Cached pg.transform.flip for frames returned by get_image"""
+    key = ('flip', FRAME_KEYS.get(image, image), xbool, ybool)
+    flipped = FRAME_CACHE.get(key)
+    if flipped is None:
+        flipped = pg.transform.flip(image, xbool, ybool)
+        FRAME_CACHE[key] = flipped
+        FRAME_KEYS[flipped] = key
+    return flipped
+
+
+def get_blank_image(size):
+    """A fully transparent frame of the given size"""
+    key = ('blank', size)
+    image = FRAME_CACHE.get(key)
+    if image is None:
+        image = pg.Surface(size).convert()
+        image.set_alpha(0)
+        FRAME_CACHE[key] = image
+        FRAME_KEYS[image] = key
+    return image
+
+
+def clear_frame_cache():
+    """Empties the frame cache so every frame is cut and scaled again the
+    next time it is asked for, as on a cold start.  Frames sprites already
+    hold keep working."""
+    FRAME_CACHE.clear()
+    FRAME_KEYS.clear()
+
+
+def add_sheet(name, image):
+    """Registers a loaded sprite sheet under its name, which is how the
+    frame cache refers to it"""
+    SHEET_NAMES[image] = name
+    SHEETS[name] = image
+
+
+GFX_EXTENSIONS = ('.png', '.jpg', '.bmp')
+
+
+def load_all_gfx(directory, colorkey=(255,0,255), accept=GFX_EXTENSIONS):
     graphics = {}
     for pic in os.listdir(directory):
         name, ext = os.path.splitext(pic)
@@ -119,6 +395,7 @@ def load_all_gfx(directory, colorkey=(255,0,255), accept=('.png', 'jpg', 'bmp'))
                 img = img.convert()
                 img.set_colorkey(colorkey)
             graphics[name]=img
+            add_sheet(name, img)
     return graphics
 
 
@@ -135,21 +412,37 @@ def load_all_fonts(directory, accept=('.ttf')):
     return load_all_music(directory, accept)
 
 
-def load_all_sfx(directory, accept=('.wav','.mpe','.ogg','.mdi')):
+def load_all_sfx(directory, accept=('.wav','.mpe','.ogg','.mdi'), headless=False):
     effects = {}
     for fx in os.listdir(directory):
         name, ext = os.path.splitext(fx)
         if ext.lower() in accept:
-            effects[name] = pg.mixer.Sound(os.path.join(directory, fx))
+            if headless:
+                effects[name] = NullSound()
+            else:
+                effects[name] = pg.mixer.Sound(os.path.join(directory, fx))
     return effects
 
 
+class NullSound(object):
+    """Silent stand-in for pg.mixer.Sound used when running headless"""
+    def play(self, *args, **kwargs):
+        pass
 
+    def stop(self):
+        pass
 
 
+class NullMusic(object):
+    """Silent stand-in for pg.mixer.music used when running headless"""
+    def load(self, filename):
+        pass
 
+    def play(self, *args, **kwargs):
+        pass
 
+    def stop(self):
+        pass
 
-
-
-
+    def get_busy(self):
+        return False
@@ -7,12 +7,86 @@ Super Mario Bros for the NES.
 """
 
 import sys
+import time
+import argparse
 import pygame as pg
 from data.main import main
+from data.profiler import FrameProfiler, TraceProfiler
+from data import constants as c
 import cProfile
 
 
+def parse_args():
+    """Command line options"""
+    parser = argparse.ArgumentParser(description='Super Mario Bros 1-1')
+    parser.add_argument('--headless', action='store_true',
+                        help='run with no window, no audio and no frame cap, '
+                             'starting at the level rather than the menu')
+    parser.add_argument('--frames', type=int, default=None,
+                        help='quit after this many frames')
+    parser.add_argument('--fixed-step', action='store_true',
+                        help='advance game time 1000/60 ms per frame instead '
+                             'of following the wall clock (always on when '
+                             'headless)')
+    parser.add_argument('--render', choices=[c.RENDER_FULL, c.RENDER_DIRTY,
+                                             c.RENDER_NONE],
+                        default=c.RENDER_FULL,
+                        help='how the level is drawn: redraw the full screen '
+                             'every frame, repaint and present only the '
+                             'rects that changed, or not at all')
+    parser.add_argument('--smooth', action='store_true',
+                        help='step the game at a fixed 60 Hz and draw as '
+                             'often as the display allows, interpolating '
+                             'between steps')
+    parser.add_argument('--profile', metavar='FILE',
+                        help='time each phase of every frame, print a '
+                             'summary on exit and save percentiles and '
+                             'histograms to a JSON file')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='write every frame phase and entity count to '
+                             'a Chrome trace file for chrome://tracing or '
+                             'Perfetto')
+    parser.add_argument('--record', metavar='FILE',
+                        help='save the keys and timing of this run to a '
+                             'replay file')
+    parser.add_argument('--replay', metavar='FILE',
+                        help='play back a replay file and check it ends the '
+                             'way the recording did')
+    args = parser.parse_args()
+    if args.headless and args.frames is None and args.replay is None:
+        parser.error('--headless needs --frames or --replay; with no input '
+                     'the game would end up in the main menu and never quit')
+    return args
+
+
 if __name__=='__main__':
-    main()
+    args = parse_args()
+    if args.trace:
+        profiler = TraceProfiler(args.trace)
+    elif args.profile:
+        profiler = FrameProfiler()
+    else:
+        profiler = None
+    start = time.time()
+    control = main(args.headless, args.frames, args.fixed_step or None,
+                   args.render, args.record, args.replay, args.smooth,
+                   profiler)
+    if args.headless:
+        elapsed = time.time() - start
+        print("{} frames in {:.2f}s ({:.0f} FPS)".format(
+            control.frame_count, elapsed, control.frame_count / max(elapsed, 1e-9)))
+    if args.trace:
+        profiler.close()
+    if args.profile:
+        print(profiler.format_report())
+        profiler.save(args.profile)
+    status = 0
+    if args.replay:
+        mismatches = control.input_source.check(control.recorder)
+        if mismatches:
+            print("Replay diverged: {}".format(', '.join(mismatches)))
+            status = 1
+        else:
+            print("Replay matches the recording")
     pg.quit()
-    sys.exit()
\ No newline at end of file
+    sys.exit(status)
@@ -0,0 +1,46 @@
+__author__ = 'justinarmstrong'
+
+"""
+Frame hash tests of the level background.  Run from the top of the
+repository:
+
+    python -m unittest discover tests
+"""
+
+import hashlib
+import unittest
+import pygame as pg
+from data import setup
+from data import constants as c
+from data.components import background
+
+
+def get_hash(surface):
+    return hashlib.sha1(pg.image.tostring(surface, 'RGB')).hexdigest()
+
+
+class ChunkedBackgroundTest(unittest.TestCase):
+    """The streamed background has to match the sheet scaled whole"""
+    def setUp(self):
+        setup.init(True)
+        sheet = setup.GFX['level_1']
+        self.background = background.ChunkedBackground(
+            sheet, c.BACKGROUND_MULTIPLER, max_chunks=2)
+        self.scaled = pg.transform.scale(sheet, self.background.rect.size)
+
+
+    def test_matches_full_scale(self):
+        width, height = c.SCREEN_SIZE
+        drawn = pg.Surface(c.SCREEN_SIZE, 0, self.scaled)
+        expected = pg.Surface(c.SCREEN_SIZE, 0, self.scaled)
+        for x in list(range(0, self.background.rect.width - width, 397)) + \
+                [self.background.rect.width - width]:
+            area = (x, 0, width, height)
+            self.background.draw(drawn, (0, 0), area)
+            expected.blit(self.scaled, (0, 0), area)
+            self.assertEqual(get_hash(drawn), get_hash(expected),
+                             'x={}'.format(x))
+
+
+if __name__ == '__main__':
+    unittest.main()
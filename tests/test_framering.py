@@ -0,0 +1,79 @@
+__author__ = 'justinarmstrong'
+
+"""
+Tests of the shared memory frame ring.  Run from the top of the
+repository:
+
+    python -m unittest discover tests
+"""
+
+import unittest
+import numpy as np
+from data.framering import FrameRing
+
+
+SIZE = (8, 4)
+
+
+class FrameRingTest(unittest.TestCase):
+    def setUp(self):
+        self.ring = FrameRing(2, 3, SIZE)
+
+
+    def tearDown(self):
+        self.ring.close()
+
+
+    def test_shapes(self):
+        self.assertEqual(self.ring.get_frames(0).shape, (3, 4, 8, 3))
+        self.assertEqual(self.ring.get_surface(1, 2).get_size(), SIZE)
+
+
+    def test_surface_draws_into_frames(self):
+        """A surface over a frame is BGRA, and get_frames() reads it back
+        as RGB without copying"""
+        surface = self.ring.get_surface(1, 2)
+        surface.fill((10, 20, 30), (2, 1, 3, 2))
+        frames = self.ring.get_frames(1)
+        self.assertTrue((frames[2, 1, 2] == [10, 20, 30]).all())
+        self.assertTrue((frames[2, 0, 0] == 0).all())
+        self.assertFalse(frames[:2].any())
+        self.assertFalse(self.ring.get_frames(0).any())
+        self.assertTrue(np.shares_memory(frames, self.ring.frames))
+
+
+    def test_sequences(self):
+        """A write makes the sequence odd until it ends, and a frame read
+        before a write is no longer current after it"""
+        sequences = self.ring.sequences[0].copy()
+        self.assertTrue(self.ring.is_current(0, sequences))
+
+        self.ring.begin_write(0, 1)
+        self.assertEqual(self.ring.sequences[0, 1] % 2, 1)
+        self.assertFalse(self.ring.is_current(0, sequences))
+        self.assertEqual(self.ring.end_write(0, 1), 2)
+        self.assertFalse(self.ring.is_current(0, sequences))
+
+        written = self.ring.sequences[0].copy()
+        self.assertTrue(self.ring.is_current(0, written))
+        self.ring.begin_write(1, 1)
+        self.ring.end_write(1, 1)
+        self.assertTrue(self.ring.is_current(0, written))
+
+
+    def test_attach_by_name(self):
+        """A ring opened by name, as the workers do, shares the frames and
+        sequences"""
+        other = FrameRing(2, 3, SIZE, self.ring.name)
+        try:
+            other.get_surface(0, 0).fill((1, 2, 3))
+            other.begin_write(0, 0)
+            other.end_write(0, 0)
+            self.assertTrue((self.ring.get_frames(0)[0] == [1, 2, 3]).all())
+            self.assertEqual(self.ring.sequences[0, 0], 2)
+        finally:
+            other.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+__author__ = 'justinarmstrong'
+
+"""
+Frame hash regression tests of Level1's render modes.  Run from the top
+of the repository:
+
+    python -m unittest discover tests
+"""
+
+import hashlib
+import unittest
+import pygame as pg
+from data import constants as c
+from data.environment import Level1Env
+from benchmarks.scenarios import get_scenario
+
+
+def get_hash(surface):
+    return hashlib.sha1(pg.image.tostring(surface, 'RGB')).hexdigest()
+
+
+def play(name, render_mode, frames):
+    """Plays a scenario and returns a hash of every frame drawn"""
+    scenario = get_scenario(name)
+    env = Level1Env(1, render_mode)
+    env.reset()
+    scenario.start(env)
+    hashes = [get_hash(env.surface)]
+    for _ in range(frames):
+        env.advance(scenario.get_action(env))
+        hashes.append(get_hash(env.surface))
+        if env.done:
+            break
+    return hashes
+
+
+class DirtyRenderTest(unittest.TestCase):
+    """Dirty rect rendering repaints only what changed, and has to end up
+    with the same frame a full redraw draws"""
+    def check_scenario(self, name, frames):
+        full = play(name, c.RENDER_FULL, frames)
+        dirty = play(name, c.RENDER_DIRTY, frames)
+        self.assertEqual(len(full), len(dirty))
+        for i, (expected, drawn) in enumerate(zip(full, dirty)):
+            self.assertEqual(expected, drawn, 'frame {} differs'.format(i))
+
+
+    def test_idle(self):
+        self.check_scenario('idle', 600)
+
+
+    def test_speedrun(self):
+        self.check_scenario('speedrun', 1500)
+
+
+    def test_star(self):
+        self.check_scenario('star', 800)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+__author__ = 'justinarmstrong'
+
+"""
+Record and replay determinism tests.  Run from the top of the
+repository:
+
+    python -m unittest discover tests
+"""
+
+import os
+import random
+import hashlib
+import tempfile
+import unittest
+import pygame as pg
+from data import setup, tools
+from data import constants as c
+from data import replay as replays
+from data.main import create_states
+from data.environment import ACTIONS, get_action_keys
+from benchmarks.scenarios import get_scenario
+
+
+#Frames the script holds enter down for, to leave the main menu
+MENU_FRAMES = 10
+
+
+class ScriptedInput(object):
+    """Presses enter, then plays the speed-run route from the load
+    screen on, which runs Mario into enemies and pits"""
+    def __init__(self):
+        self.route = get_scenario('speedrun').actions
+        self.enter = tools.KeyState(tools.KeyState.bits[pg.K_RETURN])
+        self.frame = -1
+
+    def get_keys(self):
+        self.frame += 1
+        if self.frame < MENU_FRAMES:
+            return self.enter
+        route_frame = self.frame - MENU_FRAMES
+        if route_frame < len(self.route):
+            return get_action_keys(ACTIONS[self.route[route_frame]])
+        return tools.KeyState()
+
+
+class JitteryClock(object):
+    """Uneven frame times, like a wall clock, that are the same every run"""
+    def __init__(self):
+        self.random = random.Random(7)
+        self.ticks = 0
+
+    def tick(self):
+        self.ticks += self.random.choice([16, 17, 17, 18, 33])
+
+    def get_ticks(self):
+        return self.ticks
+
+
+class HashingRecorder(replays.Recorder):
+    """Recorder that also keeps a hash of every frame drawn"""
+    def __init__(self, start_state):
+        replays.Recorder.__init__(self, start_state)
+        self.hashes = []
+
+    def record(self, control):
+        replays.Recorder.record(self, control)
+        self.hashes.append(hashlib.sha1(
+            pg.image.tostring(control.screen, 'RGB')).hexdigest())
+
+
+def run(game_clock, input_source, frames, start_state):
+    """Runs the game headless and returns its recorder"""
+    control = tools.Control(setup.ORIGINAL_CAPTION, True, frames, game_clock)
+    control.input_source = input_source
+    control.recorder = HashingRecorder(start_state)
+    control.setup_states(create_states(c.RENDER_FULL), start_state)
+    control.main()
+    return control.recorder
+
+
+class ReplayTest(unittest.TestCase):
+    def setUp(self):
+        setup.init(True)
+        handle, self.filename = tempfile.mkstemp('.smbr')
+        os.close(handle)
+
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+
+    def test_replay_matches_recording(self):
+        """A replay of a recorded run draws every frame the run drew and
+        ends the same way"""
+        recorded = run(JitteryClock(), ScriptedInput(), 1500, c.MAIN_MENU)
+        recorded.save(self.filename)
+        self.assertTrue(recorded.get_summary()['mario x'] > 0)
+        self.assertTrue(recorded.get_summary()['deaths'])
+
+        replay = replays.Replay.load(self.filename)
+        self.assertEqual(len(replay), 1500)
+        self.assertEqual(replay.get_start_state(), c.MAIN_MENU)
+        played = run(replay, replay, len(replay), replay.get_start_state())
+        self.assertEqual(replay.check(played), [])
+        self.assertEqual(played.hashes, recorded.hashes)
+
+
+if __name__ == '__main__':
+    unittest.main()
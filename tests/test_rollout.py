@@ -0,0 +1,117 @@
+__author__ = 'justinarmstrong'
+
+"""
+Tests of the rollout pool and ProcessVectorEnv.  Run from the top of the repository, where
+the game finds its resources:
+
+    python -m unittest discover tests
+"""
+
+import unittest
+from data import constants as c
+from data.environment import VectorLevel1Env
+from data.rollout import RolloutPool, ProcessVectorEnv
+
+
+#Not one of ACTIONS, so the worker playing it raises
+BAD_ACTION = 99
+
+
+class RolloutPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = RolloutPool(2, frame_skip=1, render_mode=c.RENDER_NONE)
+
+
+    def tearDown(self):
+        self.pool.close()
+
+
+    def test_run(self):
+        results = self.pool.run([[1] * 5, [2] * 3])
+        self.assertEqual([len(result['rewards']) for result in results], [5, 3])
+
+
+    def test_run_after_failed_batch(self):
+        """A job that is still playing when another fails must not have
+        its reply taken for one of the next batch's"""
+        with self.assertRaises(RuntimeError):
+            self.pool.run([[0] * 1500, [BAD_ACTION]])
+        self.assertTrue(all(worker.job_id is None
+                            for worker in self.pool.workers))
+
+        results = self.pool.run([[1] * 5, [1] * 5])
+        self.assertNotIn(None, results)
+        self.assertEqual([len(result['rewards']) for result in results], [5, 5])
+
+
+class ProcessVectorEnvTest(unittest.TestCase):
+    """Each level's worker is checked against the same level stepped in
+    this process"""
+    def setUp(self):
+        self.envs = ProcessVectorEnv(2, frame_skip=4, num_slots=3)
+        self.expected = VectorLevel1Env(2, frame_skip=4)
+
+
+    def tearDown(self):
+        self.envs.close()
+
+
+    def check_step(self, actions):
+        observations, rewards, dones, infos = self.envs.step(actions)
+        expected = self.expected.step(actions)
+        self.assertTrue((observations == expected[0]).all())
+        self.assertEqual(list(rewards), list(expected[1]))
+        self.assertEqual(list(dones), list(expected[2]))
+        self.assertEqual(infos, expected[3])
+
+
+    def test_reset_and_step(self):
+        observations = self.envs.reset()
+        self.assertEqual(observations.shape,
+                         (2, c.SCREEN_HEIGHT, c.SCREEN_WIDTH, 3))
+        self.assertTrue((observations == self.expected.reset()).all())
+        for i in range(40):
+            self.check_step([1, 2 if i % 8 < 4 else 3])
+
+
+    def test_frame_ids(self):
+        """A view stays current for num_slots - 1 more steps"""
+        self.envs.reset()
+        frame_id = self.envs.get_frame_id()
+        self.envs.step([1, 1])
+        self.assertTrue(self.envs.is_current(frame_id))
+        self.envs.step([1, 1])
+        self.assertTrue(self.envs.is_current(frame_id))
+        self.envs.step([1, 1])
+        self.assertFalse(self.envs.is_current(frame_id))
+
+
+    def test_step_after_failed_step(self):
+        """A level that raises ends its write, and no reply is left over
+        to be taken for the next step's"""
+        self.envs.reset()
+        with self.assertRaises(RuntimeError):
+            self.envs.step([BAD_ACTION, 1])
+        self.assertEqual(list(self.envs.ring.sequences[self.envs.slot] % 2),
+                         [0, 0])
+
+        self.assertTrue((self.envs.reset() == self.expected.reset()).all())
+        for i in range(5):
+            self.check_step([1, 2])
+
+
+    def test_step_after_worker_died(self):
+        self.envs.reset()
+        self.envs.workers[0].process.kill()
+        self.envs.workers[0].process.join()
+        with self.assertRaises(RuntimeError):
+            self.envs.step([1, 1])
+        self.assertTrue(self.envs.workers[0].process.is_alive())
+
+        self.assertTrue((self.envs.reset() == self.expected.reset()).all())
+        for i in range(5):
+            self.check_step([1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
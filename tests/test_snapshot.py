@@ -0,0 +1,77 @@
+__author__ = 'justinarmstrong'
+
+"""
+Tests of Level1.snapshot and Level1.restore.  Run from the top of the
+repository:
+
+    python -m unittest discover tests
+"""
+
+import copy
+import pickle
+import hashlib
+import unittest
+import pygame as pg
+from data import constants as c
+from data.environment import Level1Env
+from benchmarks.scenarios import get_scenario
+
+
+def play(env, actions):
+    """Plays actions and returns a hash of every frame drawn"""
+    hashes = []
+    for action in actions:
+        env.advance(action)
+        hashes.append(hashlib.sha1(
+            pg.image.tostring(env.surface, 'RGB')).hexdigest())
+        if env.done:
+            break
+    return hashes
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.env = Level1Env(1, c.RENDER_FULL)
+        self.env.reset()
+        self.actions = get_scenario('speedrun').actions
+
+
+    def test_restore_replays_identically(self):
+        """Frames played after a restore match the ones played after the
+        snapshot was taken, in the same level and in another one"""
+        for start in (200, 600):
+            self.env.reset()
+            play(self.env, self.actions[:start])
+            snapshot = self.env.level.snapshot()
+            clock = copy.deepcopy(self.env.clock)
+            expected = play(self.env, self.actions[start:start + 300])
+            self.assertEqual(len(expected), 300)
+
+            self.env.level.restore(snapshot)
+            self.env.clock = copy.deepcopy(clock)
+            self.env.done = False
+            self.assertEqual(play(self.env, self.actions[start:start + 300]),
+                             expected)
+
+            other = Level1Env(1, c.RENDER_FULL)
+            other.reset()
+            other.level.restore(snapshot)
+            other.clock = copy.deepcopy(clock)
+            self.assertEqual(play(other, self.actions[start:start + 300]),
+                             expected)
+
+
+    def test_no_image_data(self):
+        """Surfaces are saved by name, and one the loader could not find
+        again is refused rather than saved as pixels"""
+        play(self.env, self.actions[:100])
+        snapshot = self.env.level.snapshot()
+        self.assertLess(len(snapshot), 20000)
+
+        self.env.level.mario.image = pg.Surface((10, 10))
+        with self.assertRaises(pickle.PicklingError):
+            self.env.level.snapshot()
+
+
+if __name__ == '__main__':
+    unittest.main()